@@ -0,0 +1,215 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+import logging
+import contextlib
+from urllib.parse import urlsplit
+import aiohttp
+from bs4 import BeautifulSoup
+from langchain.schema.document import Document
+
+FETCH_CACHE_DIR = os.getenv(
+    "FETCH_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "http")
+)
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", 64))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", 4))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 30))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", 3))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", 0.5))
+FETCH_MAX_RETRY_AFTER = float(os.getenv("FETCH_MAX_RETRY_AFTER", 60))  # Cap on a server's Retry-After, in seconds
+YOUTUBE_CONCURRENCY = int(os.getenv("YOUTUBE_CONCURRENCY", 8))
+USER_AGENT = os.getenv("USER_AGENT", "Mozilla/5.0 (compatible; AINexus/0.1)")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    pass
+
+
+class ResponseCache:
+    """On-disk HTTP response cache keyed by URL, storing the body plus ETag/Last-Modified validators"""
+
+    def __init__(self, cache_dir: str = FETCH_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def get(self, url: str):
+        """Return (meta, body) or (None, None) if not cached"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def put(self, url: str, meta: dict, body: bytes):
+        meta_path, body_path = self._paths(url)
+        # Write body before meta so a meta file never points at a missing/partial body
+        with open(f"{body_path}.tmp", "wb") as f:
+            f.write(body)
+        os.replace(f"{body_path}.tmp", body_path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+
+class HostLimiter:
+    """Global and per-host request slots.
+
+    Requests wait for a slot here instead of in the connector's queue, so the request timeout only
+    starts once a connection may actually be opened.
+    """
+
+    def __init__(self, max_connections: int = FETCH_MAX_CONNECTIONS, per_host: int = FETCH_PER_HOST):
+        self.per_host = per_host
+        self._total = asyncio.Semaphore(max_connections)
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+        # Per host first, so a request waiting for its host does not hold a global slot
+        async with semaphore, self._total:
+            yield
+
+
+class AsyncFetcher:
+    """Fetch many URLs concurrently over one pooled aiohttp session.
+
+    Concurrency is bounded globally and per host by a HostLimiter, requests time out (once they hold a
+    slot) and are retried with exponential backoff, and responses are cached on disk and revalidated with
+    If-None-Match/If-Modified-Since. Pages are turned into the same Documents WebBaseLoader produces.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = FETCH_MAX_CONNECTIONS,
+        per_host: int = FETCH_PER_HOST,
+        timeout: float = FETCH_TIMEOUT,
+        retries: int = FETCH_RETRIES,
+        backoff: float = FETCH_BACKOFF,
+        cache: ResponseCache = None,
+    ):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache if cache is not None else ResponseCache()
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str, limiter: HostLimiter = None) -> bytes:
+        """Return the response body for url, using the cache when the server answers 304"""
+        meta, cached_body = self.cache.get(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        limiter = limiter or HostLimiter(self.max_connections, self.per_host)
+        for attempt in range(self.retries + 1):
+            try:
+                async with limiter.slot(url), session.get(url, headers=headers) as resp:
+                    if resp.status == 304 and cached_body is not None:
+                        logging.info(f"[AsyncFetcher] Not modified, using cache: {url}")
+                        return cached_body
+                    if resp.status in RETRY_STATUSES and attempt < self.retries:
+                        delay = self._retry_delay(attempt, resp.headers.get("Retry-After"))
+                    else:
+                        resp.raise_for_status()
+                        body = await resp.read()
+                        meta = {
+                            "url": url,
+                            "etag": resp.headers.get("ETag"),
+                            "last_modified": resp.headers.get("Last-Modified"),
+                        }
+                        self.cache.put(url, meta, body)
+                        return body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUSES:
+                    raise FetchError(f"{url}: HTTP {e.status}") from e
+                if attempt >= self.retries:
+                    raise FetchError(f"{url}: {e!r}") from e
+                delay = self._retry_delay(attempt)
+            # Back off without holding the slot
+            await asyncio.sleep(delay)
+        raise FetchError(f"{url}: retries exhausted")
+
+    def _retry_delay(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), FETCH_MAX_RETRY_AFTER)
+        return self.backoff * (2**attempt) + random.uniform(0, self.backoff)
+
+    @staticmethod
+    def to_document(url: str, body: bytes) -> Document:
+        """Build a Document with the same content and metadata as WebBaseLoader"""
+        soup = BeautifulSoup(body, "html.parser")
+        metadata = {"source": url}
+        if title := soup.find("title"):
+            metadata["title"] = title.get_text()
+        if description := soup.find("meta", attrs={"name": "description"}):
+            metadata["description"] = description.get("content", "No description found.")
+        if html := soup.find("html"):
+            metadata["language"] = html.get("lang", "No language found.")
+        return Document(page_content=soup.get_text(), metadata=metadata)
+
+    async def _fetch_document(self, session: aiohttp.ClientSession, url: str, limiter: HostLimiter):
+        try:
+            body = await self.fetch(session, url, limiter)
+            # Parsing is CPU bound; keep it off the event loop so other downloads progress
+            doc = await asyncio.to_thread(self.to_document, url, body)
+            logging.info(f"Loaded document from URL: {url}")
+            return doc
+        except Exception as e:
+            logging.error(f"Failed to load document from {url}: {e}")
+            return None
+
+    async def afetch_documents(self, urls: list[str]) -> list[Document]:
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT}
+        ) as session:
+            limiter = HostLimiter(self.max_connections, self.per_host)
+            docs = await asyncio.gather(*(self._fetch_document(session, url, limiter) for url in urls))
+        return [doc for doc in docs if doc is not None]
+
+    def fetch_documents(self, urls: list[str]) -> list[Document]:
+        """Blocking wrapper, results keep the order of urls (failed URLs are skipped)"""
+        return asyncio.run(self.afetch_documents(urls))
+
+    @staticmethod
+    async def afetch_youtube(yt_urls: list[str], concurrency: int = YOUTUBE_CONCURRENCY) -> list[Document]:
+        """Load YouTube transcripts concurrently.
+
+        YoutubeLoader uses the blocking youtube-transcript-api client, so each video runs in a worker
+        thread with a bounded number in flight.
+        """
+        from langchain_community.document_loaders import YoutubeLoader
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(yt_url: str):
+            vid_id = yt_url.split("v=")[-1].split("&")[0]
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(YoutubeLoader(video_id=vid_id, add_video_info=False).load)
+                except Exception as e:
+                    logging.error(f"Failed to load youtube video {yt_url}: {e}")
+                    return []
+
+        results = await asyncio.gather(*(load(yt_url) for yt_url in yt_urls))
+        return [doc for docs in results for doc in docs]
+
+    def fetch_youtube(self, yt_urls: list[str]) -> list[Document]:
+        return asyncio.run(self.afetch_youtube(yt_urls))
@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from database.QdrantDB import QdrantDB
+from Retriever import Retriever, retriever
+from Reindexer import VERSION_PATTERN
+
+REGISTRY_MAX_ACTIVE = int(os.getenv("REGISTRY_MAX_ACTIVE", 8))
+REGISTRY_IDLE_TTL = float(os.getenv("REGISTRY_IDLE_TTL", 1800))
+
+
+class CollectionRegistry:
+    """Per-tenant Retrievers (one Qdrant collection each) opened lazily over one shared client and embedder.
+
+    Only the in-memory keyword indexes of recently used tenants are kept: beyond `max_active` tenants,
+    or after `idle_ttl` seconds without a query, the least recently used Retriever is dropped and is
+    rebuilt from Qdrant on its next use. Pinned tenants (the default collection) are never evicted.
+    """
+
+    def __init__(
+        self,
+        default: Retriever,
+        max_active: int = REGISTRY_MAX_ACTIVE,
+        idle_ttl: float = REGISTRY_IDLE_TTL,
+    ):
+        self.client = default.db.client
+        # The configured embedder, even while the default collection is served with an older one
+        self.embedding_function, self.vector_size = default.db.reindex_target or (
+            default.db.embedding_function,
+            default.db.vector_size,
+        )
+        self.max_active = max_active
+        self.idle_ttl = idle_ttl
+        self.pinned = {default.collection_name}
+
+        self._lock = threading.Lock()
+        self._open_locks: dict[str, threading.Lock] = {}
+        # QdrantDB objects only hold references to the shared client/embedder, so they are cached for good
+        self._dbs: dict[str, QdrantDB] = {default.collection_name: default.db}
+        self._retrievers: OrderedDict[str, Retriever] = OrderedDict({default.collection_name: default})
+        self._last_used: dict[str, float] = {default.collection_name: time.monotonic()}
+
+    def get(self, collection_name: str) -> Retriever:
+        """Return the tenant's Retriever, opening it (and building its index) on first use"""
+        with self._lock:
+            if tenant := self._touch(collection_name):
+                self._evict()
+                return tenant
+            open_lock = self._open_locks.setdefault(collection_name, threading.Lock())
+
+        # Open outside the registry lock so other tenants keep being served during the build
+        with open_lock:
+            with self._lock:
+                if tenant := self._touch(collection_name):
+                    return tenant
+            tenant = self._open(collection_name)
+            with self._lock:
+                self._retrievers[collection_name] = tenant
+                self._last_used[collection_name] = time.monotonic()
+                self._evict()
+        return tenant
+
+    def get_db(self, collection_name: str) -> QdrantDB:
+        """QdrantDB of a tenant without building its keyword index (ingestion, deletes)"""
+        with self._lock:
+            if db := self._dbs.get(collection_name):
+                return db
+        db = QdrantDB(
+            collection_name=collection_name,
+            client=self.client,
+            embedding_function=self.embedding_function,
+            vector_size=self.vector_size,
+        )
+        with self._lock:
+            return self._dbs.setdefault(collection_name, db)
+
+    def rebuild_index(self, collection_name: str):
+        """Refresh a tenant's index after a write; tenants not currently open pick the change up on next open"""
+        with self._lock:
+            tenant = self._retrievers.get(collection_name)
+        if tenant:
+            tenant.rebuild_index()
+
+    def remove_source(self, collection_name: str, source: str) -> bool:
+        """Delete a source; an open tenant tombstones it in its keyword index instead of rebuilding"""
+        with self._lock:
+            tenant = self._retrievers.get(collection_name)
+        if tenant:
+            return tenant.remove_source(source)
+        return self.get_db(collection_name).delete_by_source(source)
+
+    def reset_collection(self, collection_name: str):
+        """Drop and recreate a collection; an open tenant gets an empty index instead of a rebuild"""
+        self.get_db(collection_name).reset_collection()
+        with self._lock:
+            tenant = self._retrievers.get(collection_name)
+        if tenant:
+            tenant.clear_index()
+
+    def list_collections(self) -> list[str]:
+        """Collection names as used by the app: reindexed collections are listed under their alias.
+
+        A versioned collection without an alias is a reindex target being built (or left by an
+        interrupted run) and is not listed, so nothing opens or ingests into it.
+        """
+        aliases = {alias.collection_name: alias.alias_name for alias in self.client.get_aliases().aliases}
+        names = []
+        for collection in self.client.get_collections().collections:
+            if collection.name in aliases:
+                names.append(aliases[collection.name])
+            elif not VERSION_PATTERN.match(collection.name):
+                names.append(collection.name)
+        return sorted(names)
+
+    def active(self) -> list[str]:
+        with self._lock:
+            return list(self._retrievers)
+
+    def _touch(self, collection_name: str):
+        tenant = self._retrievers.get(collection_name)
+        if tenant:
+            self._retrievers.move_to_end(collection_name)
+            self._last_used[collection_name] = time.monotonic()
+        return tenant
+
+    def _open(self, collection_name: str) -> Retriever:
+        logging.info(f"[CollectionRegistry] Opening collection {collection_name}")
+        tenant = Retriever(collection_name=collection_name, db=self.get_db(collection_name))
+        tenant.create_compression_retriever()
+        return tenant
+
+    def _evict(self):
+        """Drop idle tenants, then least recently used ones beyond max_active (caller holds the lock)"""
+        now = time.monotonic()
+        for name in list(self._retrievers):
+            if len(self._retrievers) <= 1:
+                break
+            over_capacity = len(self._retrievers) > self.max_active
+            idle = now - self._last_used.get(name, now) > self.idle_ttl
+            if name in self.pinned or not (over_capacity or idle):
+                continue
+            self._retrievers.pop(name).close()
+            self._last_used.pop(name, None)
+            logging.info(f"[CollectionRegistry] Evicted index of collection {name}")
+
+
+registry = CollectionRegistry(default=retriever)
@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Callable
+from DocumentLoader import DocumentLoader
+from database.QdrantDB import QdrantDB
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf", ".html")
+MANIFEST_NAME = ".ainexus_manifest.json"
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", 2.0))
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DirectorySync:
+    """Incrementally sync a data directory into a Qdrant collection.
+
+    A manifest of path, size, mtime and content hash is kept per directory. Each sync ingests only
+    new or modified files and deletes the points of removed files. Files whose size and mtime are
+    unchanged are not re-hashed.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        db: QdrantDB,
+        manifest_path: str = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        on_change: Callable[[], None] = None,
+    ):
+        self.data_dir = os.path.abspath(data_dir)
+        self.db = db
+        self.manifest_path = manifest_path or os.path.join(self.data_dir, MANIFEST_NAME)
+        self.loader_kwargs = {}
+        if chunk_size:
+            self.loader_kwargs["chunk_size"] = chunk_size
+        if chunk_overlap:
+            self.loader_kwargs["chunk_overlap"] = chunk_overlap
+        self.on_change = on_change
+        self.manifest: dict[str, dict] = self.load_manifest()
+        self._lock = threading.Lock()
+
+    def load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("collection") != self.db.collection_name:
+                logging.info(f"[DirectorySync] Manifest belongs to another collection, full sync.")
+                return {}
+            return manifest.get("files", {})
+        except Exception as e:
+            logging.warning(f"[DirectorySync] Unable to read manifest {self.manifest_path}, full sync: {e}")
+            return {}
+
+    def save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"collection": self.db.collection_name, "files": self.manifest}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def scan(self) -> dict[str, os.stat_result]:
+        """Supported files directly under data_dir (same set as DocumentLoader.load_directory)"""
+        files = {}
+        for entry in os.scandir(self.data_dir):
+            if entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                files[entry.path] = entry.stat()
+        return files
+
+    def diff(self) -> tuple[list[str], list[str], list[str]]:
+        """Return (added, modified, removed) file paths compared with the manifest"""
+        current = self.scan()
+        added, modified = [], []
+        for path, stat in current.items():
+            entry = self.manifest.get(path)
+            if entry is None:
+                added.append(path)
+            elif entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+                # Touched files with identical content only need a manifest refresh
+                if file_sha256(path) == entry["sha256"]:
+                    entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+                else:
+                    modified.append(path)
+        removed = [path for path in self.manifest if path not in current]
+        return added, modified, removed
+
+    def sync(self) -> dict:
+        """Run one incremental sync. Return counts of added, modified and removed files."""
+        with self._lock:
+            added, modified, removed = self.diff()
+            logging.info(
+                f"[DirectorySync] {self.data_dir}: {len(added)} new, {len(modified)} modified, {len(removed)} removed"
+            )
+
+            for path in removed:
+                self.delete_source(path)
+                del self.manifest[path]
+                self.save_manifest()
+
+            failed = 0
+            for path in added + modified:
+                if self.ingest_file(path):
+                    self.save_manifest()
+                else:
+                    failed += 1
+
+            # Save even when nothing was ingested: touched-but-unchanged files updated their entry in diff()
+            self.save_manifest()
+
+        summary = {"added": len(added), "modified": len(modified), "removed": len(removed), "failed": failed}
+        if self.on_change and (added or modified or removed):
+            self.on_change()
+        return summary
+
+    def ingest_file(self, path: str) -> bool:
+        """Replace the points of one file: add the new chunks first, then delete the old ones"""
+        try:
+            stat = os.stat(path)
+            sha256 = file_sha256(path)
+            old_ids = self.db.get_all_ids(source=os.path.basename(path)) if path in self.manifest else []
+            chunks = DocumentLoader(files=[path], **self.loader_kwargs).docs_chunks
+            if chunks and not self.db.add_chunks(chunks):
+                return False
+            if old_ids:
+                self.db.delete_by_ids(ids=old_ids)
+        except Exception as e:
+            logging.error(f"[DirectorySync] Failed to ingest {path}: {e}")
+            return False
+
+        self.manifest[path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256, "chunks": len(chunks)}
+        logging.info(f"[DirectorySync] Ingested {path}: {len(chunks)} chunks")
+        return True
+
+    def delete_source(self, path: str):
+        self.db.delete_by_source(os.path.basename(path))
+        logging.info(f"[DirectorySync] Removed {path}")
+
+    def watch(self, stop_event: threading.Event = None):
+        """Sync once, then keep syncing on filesystem events (debounced) until stop_event is set"""
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        stop_event = stop_event or threading.Event()
+        changed = threading.Event()
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+                if not event.is_directory and any(str(p).lower().endswith(SUPPORTED_EXTENSIONS) for p in paths):
+                    changed.set()
+
+        self.sync()
+        observer = Observer()
+        observer.schedule(_Handler(), self.data_dir, recursive=False)
+        observer.start()
+        logging.info(f"[DirectorySync] Watching {self.data_dir}")
+        try:
+            while not stop_event.is_set():
+                if not changed.wait(timeout=1.0):
+                    continue
+                # Wait until the directory has been quiet for the debounce period (e.g. large file copies)
+                while changed.is_set() and not stop_event.is_set():
+                    changed.clear()
+                    stop_event.wait(WATCH_DEBOUNCE)
+                self.sync()
+        finally:
+            observer.stop()
+            observer.join()
@@ -2,16 +2,16 @@ import os
 from langchain_community.document_loaders import (
     PyPDFLoader,
     PyPDFDirectoryLoader,
-    WebBaseLoader,
     TextLoader,
     DirectoryLoader,
     UnstructuredHTMLLoader,
     UnstructuredMarkdownLoader,
-    YoutubeLoader,
 )
 from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
 from langchain.schema.document import Document
 from database.QdrantDB import QdrantDB
+from AsyncFetcher import AsyncFetcher
+from TextSplitter import split_documents_parallel
 import time
 import bs4
 import logging
@@ -21,6 +21,8 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP"))
+SPLIT_MODE = os.getenv("SPLIT_MODE", "default")  # "default" or "fast" (multi-process split)
+LENGTH_UNIT = os.getenv("LENGTH_UNIT", "chars")  # "chars" or "tokens", only used by the fast split mode
 
 
 class DocumentLoader:
@@ -34,9 +36,13 @@ class DocumentLoader:
         urls: list = None,
         files: list = None,
         yt_urls: list = None,
+        split_mode: str = SPLIT_MODE,
+        length_unit: str = LENGTH_UNIT,
     ):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.split_mode = split_mode
+        self.length_unit = length_unit
         self.data_dir = data_dir
         self.docs: list[Document] = []
 
@@ -83,27 +89,22 @@ class DocumentLoader:
                 self.docs += UnstructuredHTMLLoader(file_path).load()
 
     def load_youtube_vid(self):
-        """Youtube videos loader"""
-        for yt_url in self.yt_urls:
-            vid_id = yt_url.split("v=")[-1].split("&")[0]
-            self.docs += YoutubeLoader(video_id=vid_id, add_video_info=False).load()
+        """Youtube videos loader, transcripts are fetched concurrently"""
+        self.docs += AsyncFetcher().fetch_youtube(self.yt_urls)
 
     def load_url_documents(self):
-        """Load HTML documents from URLs"""
-        url_docs = []
-        for url in self.urls:
-            try:
-                loader = WebBaseLoader(url)
-                docs = loader.load()
-                url_docs.extend(docs)
-                logging.info(f"Loaded document from URL: {url}")
-            except Exception as e:
-                logging.error(f"Failed to load document from {url}: {e}")
-                print(f"Failed to load document from {url}: {e}")
+        """Load HTML documents from URLs concurrently over a pooled, cached HTTP session"""
+        url_docs = AsyncFetcher().fetch_documents(self.urls)
+        logging.info(f"Loaded {len(url_docs)}/{len(self.urls)} URL documents")
         self.docs += url_docs
 
     def split_documents(self) -> list[Document]:
         """Split loaded documents into chunks"""
+        if self.split_mode == "fast":
+            return split_documents_parallel(
+                self.docs, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap, length_unit=self.length_unit
+            )
+
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
@@ -127,6 +128,7 @@ class DocumentLoader:
                         source=''
                         page=
                         created_at=
+                        created_ts=
                     }
                 }
             ]
@@ -135,6 +137,10 @@ class DocumentLoader:
 
         last_page_id = None
         current_chunk_index = 0
+        created_ts = int(time.time())
+        created_at = time.strftime("%Y%m%d_%H%M%S", time.localtime(created_ts))
+        # Per-chunk metadata logging is costly on large ingests, only emit it at DEBUG level
+        log_chunks = logging.getLogger().isEnabledFor(logging.DEBUG)
 
         for i, chunk in enumerate(chunks):
             # source = chunk.metadata.get("source", "").split("\\")[-1].split("//")[-1]
@@ -154,14 +160,36 @@ class DocumentLoader:
             chunk.metadata["chunk_id"] = chunk_id
             chunk.metadata["source"] = source
             chunk.metadata["page"] = page
-            chunk.metadata["created_at"] = time.strftime("%Y%m%d_%H%M%S")
-            logging.info(f"Processed chunk metadata: {chunk.metadata}")
+            chunk.metadata["created_at"] = created_at
+            chunk.metadata["created_ts"] = created_ts
+            if log_chunks:
+                logging.debug(f"Processed chunk metadata: {chunk.metadata}")
+
+        logging.info(f"Processed {len(chunks)} chunks")
 
         return chunks
 
 
 if __name__ == "__main__":
-    chunks = DocumentLoader().docs_chunks
-    if chunks:
-        vector_db = QdrantDB(collection_name="test")
-        vector_db.add_chunks(chunks)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest a data directory into Qdrant")
+    parser.add_argument("data_dir", nargs="?", default=None, help="Directory of txt/md/pdf/html files")
+    parser.add_argument("--collection", default="test", help="Target Qdrant collection")
+    parser.add_argument("--sync", action="store_true", help="Only ingest new/modified files, delete removed ones")
+    parser.add_argument("--watch", action="store_true", help="Keep syncing on file changes (implies --sync)")
+    args = parser.parse_args()
+
+    vector_db = QdrantDB(collection_name=args.collection)
+    if args.sync or args.watch:
+        from DirectorySync import DirectorySync
+
+        directory_sync = DirectorySync(data_dir=args.data_dir or ".", db=vector_db)
+        if args.watch:
+            directory_sync.watch()
+        else:
+            print(directory_sync.sync())
+    else:
+        chunks = DocumentLoader(data_dir=args.data_dir).docs_chunks
+        if chunks:
+            vector_db.add_chunks(chunks)
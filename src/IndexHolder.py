@@ -0,0 +1,167 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """Immutable view of a built retriever index"""
+
+    generation: int
+    index: Any
+    doc_count: int = 0
+
+
+class IndexHolder:
+    """Copy-on-write holder for the retriever index.
+
+    Readers call `current()` and keep using the snapshot they got for the whole query.
+    Rebuilds run on a single background thread and the finished snapshot is swapped in
+    atomically with an increasing generation number, so a query never sees a half built index.
+    """
+
+    def __init__(self, builder: Callable[[], tuple[Any, int]]):
+        """builder: returns (index, doc_count) for a freshly built index"""
+        self._builder = builder
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._generation = 0
+        self._swap_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: Optional[Future] = None
+        self._dirty = False
+        self._closed = False
+        # Mutations applied while builds are running, replayed on their result before it is swapped in
+        self._mutations: list[Callable[[Any, int], tuple[Any, int]]] = []
+        self._builds_running = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-rebuild")
+
+    def current(self) -> Optional[IndexSnapshot]:
+        """Return the latest published snapshot (None until the first build completes)"""
+        return self._snapshot
+
+    @property
+    def generation(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.generation if snapshot else 0
+
+    def swap(self, index: Any, doc_count: int = 0) -> Optional[IndexSnapshot]:
+        """Publish a new snapshot. Single reference assignment, so readers see old or new, never partial.
+        Return None once the holder is closed."""
+        with self._swap_lock:
+            snapshot = self._publish(index, doc_count)
+        if snapshot:
+            logging.info(f"[IndexHolder] Swapped in index generation {snapshot.generation} ({doc_count} chunks)")
+        return snapshot
+
+    def _publish(self, index: Any, doc_count: int) -> Optional[IndexSnapshot]:
+        """Caller holds the swap lock"""
+        if self._closed:
+            return None
+        self._generation += 1
+        snapshot = IndexSnapshot(generation=self._generation, index=index, doc_count=doc_count)
+        self._snapshot = snapshot
+        return snapshot
+
+    def rebuild(self) -> Optional[IndexSnapshot]:
+        """Build a new index on the calling thread and swap it in. Return None if the build failed."""
+        with self._swap_lock:
+            self._builds_running += 1
+            mutations_start = len(self._mutations)
+        try:
+            index, doc_count = self._builder()
+        except Exception as e:
+            logging.error(f"[IndexHolder] Failed to rebuild index, keep generation {self.generation}: {e}")
+            index = None
+        with self._swap_lock:
+            self._builds_running -= 1
+            snapshot = None
+            if index is not None:
+                # The build may have read data from before these mutations (e.g. a delete), re-apply them
+                for mutation in self._mutations[mutations_start:]:
+                    index, doc_count = mutation(index, doc_count)
+                snapshot = self._publish(index, doc_count)
+            if self._builds_running == 0:
+                self._mutations = []
+        if snapshot:
+            logging.info(f"[IndexHolder] Swapped in index generation {snapshot.generation} ({doc_count} chunks)")
+        return snapshot
+
+    def mutate(self, mutation: Callable[[Any, int], tuple[Any, int]]) -> Optional[IndexSnapshot]:
+        """Publish mutation(index, doc_count) of the current snapshot without a rebuild.
+
+        The mutation must return a new index object (copy-on-write) and be cheap, it runs under the swap lock.
+        It is also replayed on the result of any rebuild running at the same time.
+        """
+        with self._swap_lock:
+            if self._builds_running:
+                self._mutations.append(mutation)
+            current = self._snapshot
+            if current is None:
+                return None
+            return self._publish(*mutation(current.index, current.doc_count))
+
+    def refresh_async(self, transform: Callable[[Any, int], tuple[Any, int]]) -> Future:
+        """Run an expensive transform of the current snapshot (e.g. compaction) on the rebuild thread.
+
+        The result is only published if no other snapshot was swapped in meanwhile, otherwise it is dropped.
+        """
+        def run():
+            current = self._snapshot
+            if current is None:
+                return None
+            index, doc_count = transform(current.index, current.doc_count)
+            with self._swap_lock:
+                if self._snapshot is not current:
+                    return None
+                return self._publish(index, doc_count)
+
+        with self._pending_lock:
+            if self._closed:
+                future = Future()
+                future.set_result(None)
+                return future
+            return self._executor.submit(run)
+
+    def rebuild_async(self) -> Future:
+        """Schedule a background rebuild.
+
+        Requests arriving while a rebuild is running are coalesced into one follow-up rebuild,
+        so a burst of uploads/deletes triggers at most one extra build.
+        """
+        with self._pending_lock:
+            if self._closed:
+                future = Future()
+                future.set_result(None)
+                return future
+            if self._pending is not None:
+                self._dirty = True
+                return self._pending
+            self._pending = self._executor.submit(self._run_rebuilds)
+            return self._pending
+
+    def _run_rebuilds(self) -> Optional[IndexSnapshot]:
+        snapshot = self.rebuild()
+        while True:
+            with self._pending_lock:
+                if not self._dirty:
+                    # Clear under the lock so a request arriving now schedules a fresh rebuild
+                    self._pending = None
+                    return snapshot
+                self._dirty = False
+            snapshot = self.rebuild() or snapshot
+
+    def wait(self, timeout: float = None) -> Optional[IndexSnapshot]:
+        """Block until the pending rebuild (if any) finishes"""
+        pending = self._pending
+        if pending is not None:
+            pending.result(timeout=timeout)
+        return self._snapshot
+
+    def close(self):
+        """Release the snapshot and stop the rebuild thread once pending work is done"""
+        with self._pending_lock:
+            self._closed = True
+        self._executor.shutdown(wait=False)
+        self._snapshot = None
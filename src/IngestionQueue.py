@@ -0,0 +1,377 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from uuid import uuid4
+from typing import Callable, Optional
+from langchain.schema.document import Document
+from database.QdrantDB import QdrantDB
+from Retriever import retriever
+from CollectionRegistry import registry
+
+INGEST_DB_PATH = os.getenv(
+    "INGEST_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest", "jobs.db")
+)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 1))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+POLL_INTERVAL = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+CANCELLED = "cancelled"
+COMPLETED = "completed"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING, CANCELLING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    status TEXT NOT NULL,
+    files TEXT NOT NULL DEFAULT '[]',
+    chunk_size INTEGER,
+    chunk_overlap INTEGER,
+    files_total INTEGER NOT NULL DEFAULT 0,
+    files_parsed INTEGER NOT NULL DEFAULT 0,
+    chunks_total INTEGER NOT NULL DEFAULT 0,
+    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+    points_upserted INTEGER NOT NULL DEFAULT 0,
+    batches_done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IngestionQueue:
+    """Persistent SQLite-backed queue of ingestion jobs processed by background worker threads.
+
+    A job either carries already split chunks (upload page) or file paths that the worker parses.
+    Parsed chunks are persisted with their point ids before embedding, and progress is committed
+    per batch, so a job interrupted by a crash resumes from its last finished batch without
+    creating duplicate points.
+    """
+
+    def __init__(
+        self,
+        db: QdrantDB,
+        db_path: str = INGEST_DB_PATH,
+        batch_size: int = INGEST_BATCH_SIZE,
+        on_complete: Callable[[dict], None] = None,
+        db_resolver: Callable[[str], QdrantDB] = None,
+    ):
+        """db: default collection; db_resolver: returns the QdrantDB of a job's collection (multi-tenant);
+        on_complete: called after a job completed or a cancelled job was rolled back, to refresh indexes"""
+        self.db = db
+        self.db_resolver = db_resolver
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.on_complete = on_complete
+        self._local = threading.local()
+        self._workers: list[threading.Thread] = []
+        self._stop = threading.Event()
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections must not be shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _now() -> str:
+        return time.strftime("%Y%m%d_%H%M%S")
+
+    def _resolve_db(self, job: dict) -> QdrantDB:
+        """QdrantDB instance the job writes into"""
+        if job["collection"] == self.db.collection_name or self.db_resolver is None:
+            return self.db
+        return self.db_resolver(job["collection"])
+
+    # ---------- Producer API ----------
+
+    def enqueue_chunks(self, chunks: list[Document], collection: str = None) -> str:
+        """Queue already split chunks for embedding and upsert. Return the job id."""
+        job_id = str(uuid4())
+        now = self._now()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (id, collection, status, chunks_total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, collection or self.db.collection_name, QUEUED, len(chunks), now, now),
+            )
+            self._store_chunks(conn, job_id, 0, chunks)
+        logging.info(f"[IngestionQueue] Queued job {job_id} with {len(chunks)} chunks")
+        return job_id
+
+    def enqueue_files(
+        self, files: list[str], chunk_size: int = None, chunk_overlap: int = None, collection: str = None
+    ) -> str:
+        """Queue files to be parsed, split, embedded and upserted by a worker. Return the job id."""
+        job_id = str(uuid4())
+        now = self._now()
+        self._connect().execute(
+            "INSERT INTO jobs (id, collection, status, files, chunk_size, chunk_overlap, files_total, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job_id,
+                collection or self.db.collection_name,
+                QUEUED,
+                json.dumps(files),
+                chunk_size,
+                chunk_overlap,
+                len(files),
+                now,
+                now,
+            ),
+        )
+        logging.info(f"[IngestionQueue] Queued job {job_id} with {len(files)} files")
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation. Queued jobs stop immediately, running jobs after their current batch.
+
+        A cancelled job is all or nothing: the points a running job already upserted are deleted
+        again, so no partial file stays searchable.
+        """
+        conn = self._connect()
+        now = self._now()
+        cur = conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?", (CANCELLED, now, job_id, QUEUED)
+        )
+        if cur.rowcount:
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            return True
+        cur = conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?", (CANCELLING, now, job_id, RUNNING)
+        )
+        return bool(cur.rowcount)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_jobs(self, limit: int = 20, active_only: bool = False) -> list[dict]:
+        if active_only:
+            rows = self._connect().execute(
+                f"SELECT * FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))}) ORDER BY created_at DESC LIMIT ?",
+                (*ACTIVE_STATUSES, limit),
+            )
+        else:
+            rows = self._connect().execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows.fetchall()]
+
+    # ---------- Workers ----------
+
+    def start(self, num_workers: int = INGEST_WORKERS):
+        """Recover interrupted jobs and start worker threads (idempotent)"""
+        if self._workers:
+            return
+        conn = self._connect()
+        now = self._now()
+        # A job still marked running belongs to a worker that died: resume it from its last batch
+        resumed = conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?", (QUEUED, now, RUNNING)
+        ).rowcount
+        # A job cancelled while its worker died still has to be rolled back
+        for row in conn.execute("SELECT * FROM jobs WHERE status = ?", (CANCELLING,)).fetchall():
+            self._rollback(dict(row))
+        conn.execute("DELETE FROM job_chunks WHERE job_id IN (SELECT id FROM jobs WHERE status = ?)", (CANCELLED,))
+        if resumed:
+            logging.info(f"[IngestionQueue] Resuming {resumed} interrupted job(s)")
+
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+        self._stop.clear()
+
+    def _claim_next(self) -> Optional[dict]:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, self._now(), row["id"]))
+        job = dict(row)
+        job["status"] = RUNNING
+        return job
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            job = self._claim_next()
+            if job is None:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: dict):
+        job_id = job["id"]
+        logging.info(f"[IngestionQueue] Running job {job_id} ({job['collection']})")
+        try:
+            self._parse_files(job)
+            self._upsert_batches(job)
+        except JobCancelled:
+            self._rollback(job)
+            return
+        except Exception as e:
+            # Keep the stored chunks so the job can be re-queued and resumed
+            self._update(job_id, status=FAILED, error=str(e))
+            logging.error(f"[IngestionQueue] Job {job_id} failed: {e}")
+            return
+
+        self._finish(job_id, COMPLETED)
+        logging.info(f"[IngestionQueue] Job {job_id} completed: {job['chunks_total']} chunks")
+        self._notify(job_id)
+
+    def _rollback(self, job: dict):
+        """Delete the points of a cancelled job, then mark it cancelled"""
+        job_id = job["id"]
+        # Up to chunks_embedded, not points_upserted: the last batch may be upserted but not yet recorded
+        rows = self._connect().execute(
+            "SELECT metadata FROM job_chunks WHERE job_id = ? AND seq < ? ORDER BY seq",
+            (job_id, job["chunks_embedded"]),
+        ).fetchall()
+        ids = [point_id for row in rows if (point_id := json.loads(row["metadata"]).get("id"))]
+        if ids:
+            db = self._resolve_db(job)
+            for start in range(0, len(ids), self.batch_size):
+                db.delete_by_ids(ids=ids[start : start + self.batch_size])
+        self._finish(job_id, CANCELLED)
+        logging.info(f"[IngestionQueue] Job {job_id} cancelled, {len(ids)} upserted chunks rolled back")
+        if ids:
+            self._notify(job_id)
+
+    def _notify(self, job_id: str):
+        if self.on_complete:
+            try:
+                self.on_complete(self.get_job(job_id))
+            except Exception as e:
+                logging.error(f"[IngestionQueue] on_complete callback failed for job {job_id}: {e}")
+
+    def retry(self, job_id: str) -> bool:
+        """Re-queue a failed job; it resumes from its last finished batch"""
+        cur = self._connect().execute(
+            "UPDATE jobs SET status = ?, error = NULL, updated_at = ? WHERE id = ? AND status = ?",
+            (QUEUED, self._now(), job_id, FAILED),
+        )
+        return bool(cur.rowcount)
+
+    def _check_cancelled(self, job_id: str):
+        row = self._connect().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["status"] in (CANCELLING, CANCELLED):
+            raise JobCancelled(job_id)
+
+    def _parse_files(self, job: dict):
+        """Parse and split remaining files, persisting chunks file by file"""
+        from DocumentLoader import DocumentLoader
+
+        files = json.loads(job["files"])
+        conn = self._connect()
+        for file in files[job["files_parsed"] :]:
+            self._check_cancelled(job["id"])
+            loader_kwargs = {"files": [file]}
+            if job["chunk_size"]:
+                loader_kwargs["chunk_size"] = job["chunk_size"]
+            if job["chunk_overlap"]:
+                loader_kwargs["chunk_overlap"] = job["chunk_overlap"]
+            chunks = DocumentLoader(**loader_kwargs).docs_chunks
+
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._store_chunks(conn, job["id"], job["chunks_total"], chunks)
+                job["files_parsed"] += 1
+                job["chunks_total"] += len(chunks)
+                conn.execute(
+                    "UPDATE jobs SET files_parsed = ?, chunks_total = ?, updated_at = ? WHERE id = ?",
+                    (job["files_parsed"], job["chunks_total"], self._now(), job["id"]),
+                )
+
+    def _upsert_batches(self, job: dict):
+        """Embed and upsert stored chunks batch by batch, starting after the last committed batch"""
+        db = self._resolve_db(job)
+        conn = self._connect()
+        while True:
+            self._check_cancelled(job["id"])
+            start = job["batches_done"] * self.batch_size
+            rows = conn.execute(
+                "SELECT content, metadata FROM job_chunks WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (job["id"], start, self.batch_size),
+            ).fetchall()
+            if not rows:
+                return
+
+            chunks = [Document(page_content=row["content"], metadata=json.loads(row["metadata"])) for row in rows]
+            # Embedding and upsert form one write, so a reindex cutover never lands between them
+            with db.write_gate.writing():
+                embeddings = db.embed_documents([chunk.page_content for chunk in chunks])
+                job["chunks_embedded"] = start + len(chunks)
+                self._update(job["id"], chunks_embedded=job["chunks_embedded"])
+                db.upsert_chunks(chunks, embeddings)
+            job["batches_done"] += 1
+            job["points_upserted"] = start + len(chunks)
+            self._update(job["id"], points_upserted=job["points_upserted"], batches_done=job["batches_done"])
+
+    @staticmethod
+    def _store_chunks(conn: sqlite3.Connection, job_id: str, offset: int, chunks: list[Document]):
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_chunks (job_id, seq, content, metadata) VALUES (?, ?, ?, ?)",
+            (
+                (job_id, offset + i, chunk.page_content, json.dumps(chunk.metadata, default=str))
+                for i, chunk in enumerate(chunks)
+            ),
+        )
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = self._now()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        self._connect().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _finish(self, job_id: str, status: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, self._now(), job_id))
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+
+ingestion_queue = IngestionQueue(
+    db=retriever.db,
+    db_resolver=registry.get_db,
+    on_complete=lambda job: registry.rebuild_index(job["collection"]),
+)
+ingestion_queue.start()
@@ -0,0 +1,244 @@
+import copy
+import uuid
+import logging
+from array import array
+from collections import Counter
+from typing import Callable, Iterable, Optional
+import numpy as np
+from langchain.schema.document import Document
+from RetrievalFilter import RetrievalFilter
+
+# Same defaults as rank_bm25.BM25Okapi used by LangChain's BM25Retriever
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+MISSING_TS = -1  # created_ts of chunks ingested before the field existed
+MAX_TF = np.iinfo(np.uint16).max
+PointId = int | str
+
+
+def encode_point_id(point_id: PointId) -> tuple[bytes, bool]:
+    """16 raw bytes of a Qdrant point id (uuid string or unsigned integer) and whether it is an integer"""
+    if isinstance(point_id, int) or point_id.isdigit():
+        return int(point_id).to_bytes(16, "big"), True
+    return uuid.UUID(point_id).bytes, False
+
+
+def default_preprocess(text: str) -> list[str]:
+    """Same tokenizer as LangChain's BM25Retriever"""
+    return text.split()
+
+
+class KeywordIndex:
+    """BM25 (Okapi) keyword index over compact NumPy arrays, so filtered queries only score matching chunks.
+
+    Scores match rank_bm25.BM25Okapi. Only what scoring and filtering need is kept in memory: CSR
+    postings (term -> chunk index, term frequency), chunk lengths, point ids (uuid or integer, as 16
+    bytes) and the filter columns (source code, page, created_ts). Chunk texts are not held; `search`
+    fetches the top k chunks from Qdrant through `fetch_docs` (str(point id) -> Document). The index
+    is built from a stream of (point id, content, metadata) records, so a full list of Documents never
+    has to exist.
+
+    Deleted chunks are tombstoned (`without_sources`) instead of re-indexed; the corpus statistics
+    (idf, average length) keep counting them until `compact()` drops them from the arrays.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[tuple[PointId, str, dict]],
+        fetch_docs: Callable[[list[PointId]], dict[str, Document]],
+        preprocess_func: Callable[[str], list[str]] = default_preprocess,
+    ):
+        self.preprocess_func = preprocess_func
+        self.fetch_docs = fetch_docs
+        self.vocab: dict[str, int] = {}
+        self.source_names: list[str] = []
+        self.source_index: dict[str, int] = {}
+
+        ids, int_ids = bytearray(), bytearray()
+        source_codes, pages, created_ts, doc_len = array("i"), array("i"), array("q"), array("i")
+        post_terms, post_docs, post_tf = array("i"), array("i"), array("H")
+        for doc_idx, (point_id, content, metadata) in enumerate(records):
+            # DocumentLoader sets uuid4 ids, imported snapshots may also hold integer ids
+            id_bytes, is_int = encode_point_id(point_id)
+            ids += id_bytes
+            int_ids.append(is_int)
+            source = metadata.get("source", "")
+            if source not in self.source_index:
+                self.source_index[source] = len(self.source_names)
+                self.source_names.append(source)
+            source_codes.append(self.source_index[source])
+            pages.append(int(metadata.get("page") or 0))
+            ts = metadata.get("created_ts")
+            created_ts.append(int(ts) if ts is not None else MISSING_TS)
+
+            tokens = preprocess_func(content)
+            doc_len.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                post_terms.append(self.vocab.setdefault(token, len(self.vocab)))
+                post_docs.append(doc_idx)
+                post_tf.append(min(tf, MAX_TF))
+
+        self.ids = np.frombuffer(bytes(ids), dtype=np.uint8).reshape(-1, 16)
+        self.int_ids = np.frombuffer(bytes(int_ids), dtype=bool)
+        self.source_codes = np.array(source_codes, dtype=np.int32)
+        self.pages = np.array(pages, dtype=np.int32)
+        self.created_ts = np.array(created_ts, dtype=np.int64)
+        self.doc_len = np.array(doc_len, dtype=np.int32)
+
+        # COO -> CSR: a stable sort by term keeps each posting list in chunk order
+        terms = np.frombuffer(post_terms, dtype=np.int32)
+        order = np.argsort(terms, kind="stable")
+        self.post_docs = np.frombuffer(post_docs, dtype=np.int32)[order]
+        self.post_tf = np.frombuffer(post_tf, dtype=np.uint16)[order]
+        self.indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocab)), out=self.indptr[1:])
+        del terms, order, post_terms, post_docs, post_tf
+
+        self.deleted = np.zeros(len(self.doc_len), dtype=bool)
+        self.deleted_sources: frozenset[str] = frozenset()
+        self._compute_stats()
+        logging.info(
+            f"[KeywordIndex] Indexed {len(self.doc_len)} chunks, {len(self.vocab)} terms, {self.nbytes / 2**20:.1f} MB"
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_len) - self._deleted_count
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the NumPy arrays (the vocabulary dict is not counted)"""
+        arrays = (self.ids, self.int_ids, self.source_codes, self.pages, self.created_ts, self.doc_len, self.norm)
+        return sum(a.nbytes for a in arrays) + self.post_docs.nbytes + self.post_tf.nbytes + self.indptr.nbytes
+
+    @property
+    def tombstone_ratio(self) -> float:
+        return self._deleted_count / len(self.doc_len) if len(self.doc_len) else 0.0
+
+    def without_sources(self, sources: list[str]) -> "KeywordIndex":
+        """Copy sharing the postings, with every chunk of the given sources tombstoned"""
+        codes = [self.source_index[source] for source in sources if source in self.source_index]
+        removed = np.isin(self.source_codes, codes)
+        index = copy.copy(self)
+        index.deleted = self.deleted | removed
+        index._deleted_count = int(index.deleted.sum())
+        index.deleted_sources = self.deleted_sources | set(sources)
+        removed_count = index._deleted_count - self._deleted_count
+        logging.info(f"[KeywordIndex] Tombstoned {removed_count} chunks of {len(sources)} source(s)")
+        return index
+
+    def compact(self) -> "KeywordIndex":
+        """New index over the live chunks only, filtered from the arrays (no round-trip to Qdrant)"""
+        keep = ~self.deleted
+        new_doc_idx = (np.cumsum(keep) - 1).astype(np.int32)
+        post_keep = keep[self.post_docs]
+        post_terms = np.repeat(np.arange(len(self.vocab), dtype=np.int32), np.diff(self.indptr))[post_keep]
+        term_counts = np.bincount(post_terms, minlength=len(self.vocab))
+        live_terms = term_counts > 0
+        new_term_id = np.cumsum(live_terms) - 1
+
+        index = copy.copy(self)
+        index.vocab = {token: int(new_term_id[term]) for token, term in self.vocab.items() if live_terms[term]}
+        index.post_docs = new_doc_idx[self.post_docs[post_keep]]
+        index.post_tf = self.post_tf[post_keep]
+        index.indptr = np.zeros(len(index.vocab) + 1, dtype=np.int64)
+        np.cumsum(term_counts[live_terms], out=index.indptr[1:])
+
+        live_codes = np.unique(self.source_codes[keep])
+        code_map = np.full(len(self.source_names), -1, dtype=np.int32)
+        code_map[live_codes] = np.arange(len(live_codes), dtype=np.int32)
+        index.source_names = [self.source_names[code] for code in live_codes]
+        index.source_index = {source: code for code, source in enumerate(index.source_names)}
+        index.source_codes = code_map[self.source_codes[keep]]
+
+        index.ids = self.ids[keep]
+        index.int_ids = self.int_ids[keep]
+        index.pages = self.pages[keep]
+        index.created_ts = self.created_ts[keep]
+        index.doc_len = self.doc_len[keep]
+        index.deleted = np.zeros(len(index.doc_len), dtype=bool)
+        index.deleted_sources = frozenset()
+        index._compute_stats()
+        logging.info(f"[KeywordIndex] Compacted to {len(index)} chunks, {len(index.vocab)} terms")
+        return index
+
+    def point_id(self, idx: int) -> PointId:
+        """Qdrant point id of a chunk, as the client expects it (uuid string or int)"""
+        raw = self.ids[idx].tobytes()
+        return int.from_bytes(raw, "big") if self.int_ids[idx] else str(uuid.UUID(bytes=raw))
+
+    def _compute_stats(self):
+        self._deleted_count = int(self.deleted.sum())
+        corpus_size = len(self.doc_len)
+        self.avgdl = float(self.doc_len.mean()) if corpus_size else 0.0
+        self.norm = (K1 * (1 - B + B * self.doc_len / (self.avgdl or 1.0))).astype(np.float32)
+
+        freq = np.diff(self.indptr)
+        idf = np.log(corpus_size - freq + 0.5) - np.log(freq + 0.5)
+        eps = EPSILON * idf.mean() if len(idf) else 0.0
+        idf[idf < 0] = eps
+        self.idf = idf
+
+    def allowed(self, flt: Optional[RetrievalFilter]) -> Optional[np.ndarray]:
+        """Boolean mask of live chunks matching the filter, None when every chunk is allowed"""
+        if flt is None or flt.is_empty():
+            return None
+        mask = ~self.deleted
+        if flt.sources:
+            codes = [self.source_index[source] for source in flt.sources if source in self.source_index]
+            mask &= np.isin(self.source_codes, codes)
+        return mask & flt.mask(self.pages, self.created_ts)
+
+    def search(self, query: str, k: int, flt: RetrievalFilter = None) -> list[Document]:
+        """Top k chunks by BM25 score among the chunks allowed by the filter, fetched with `fetch_docs`"""
+        return self.search_many([query], k, flt)[0]
+
+    def search_many(self, queries: list[str], k: int, flt: RetrievalFilter = None) -> list[list[Document]]:
+        """`search` for several queries, with the union of their top chunks fetched in one call"""
+        allowed = self.allowed(flt)
+        if allowed is not None and not allowed.any():
+            return [[] for _ in queries]
+        tops = [self._top(query, k, allowed) for query in queries]
+
+        # Only the top k chunks are materialized as Documents
+        unique = list(dict.fromkeys(int(idx) for top in tops for idx in top))
+        point_ids = [self.point_id(idx) for idx in unique]
+        # Keyed by point id: metadata["id"] may be missing or differ for points not written by DocumentLoader
+        fetched = self.fetch_docs(point_ids) if point_ids else {}
+        results = []
+        for top in tops:
+            docs = [fetched.get(str(self.point_id(idx))) for idx in top]
+            # Copies, so a chunk returned for several queries can be annotated independently
+            results.append(
+                [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in docs if doc]
+            )
+        return results
+
+    def _top(self, query: str, k: int, allowed: Optional[np.ndarray]) -> np.ndarray:
+        """Chunk indexes of the k best BM25 scores, best first"""
+        # Repeated query tokens count again, as in rank_bm25
+        term_ids = [self.vocab[token] for token in self.preprocess_func(query) if token in self.vocab]
+        if not term_ids:
+            return np.empty(0, dtype=np.int32)
+        doc_parts, score_parts = [], []
+        for term in term_ids:
+            start, end = self.indptr[term], self.indptr[term + 1]
+            docs = self.post_docs[start:end]
+            tf = self.post_tf[start:end].astype(np.float64)
+            doc_parts.append(docs)
+            score_parts.append(self.idf[term] * tf * (K1 + 1) / (tf + self.norm[docs]))
+        docs, scores = np.concatenate(doc_parts), np.concatenate(score_parts)
+        if len(term_ids) > 1:
+            docs, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+
+        # The allowed mask already excludes tombstones
+        keep = allowed[docs] if allowed is not None else ~self.deleted[docs]
+        docs, scores = docs[keep], scores[keep]
+        if len(docs) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            docs, scores = docs[top], scores[top]
+        return docs[np.lexsort((docs, -scores))]
+
+    def list_sources(self) -> list[str]:
+        return sorted(source for source in self.source_names if source not in self.deleted_sources)
@@ -0,0 +1,135 @@
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from langchain_ollama import ChatOllama
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+EXPANSION_MODEL_NAME = os.getenv("EXPANSION_MODEL_NAME") or os.getenv("MODEL_NAME")
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "off")  # "off", "multi" (rephrasings) or "hyde" (hypothetical answer)
+EXPANSION_QUERIES = int(os.getenv("EXPANSION_QUERIES", 3))
+EXPANSION_BUDGET_MS = float(os.getenv("EXPANSION_BUDGET_MS", 1500))
+EXPANSION_EMA_ALPHA = 0.3
+EXPANSION_PROBE_EVERY = 10  # While over budget, still try every Nth query to notice when the LLM is fast again
+EXPANSION_MODES = ("off", "multi", "hyde")
+
+MULTI_QUERY_TEMPLATE = """
+You are helping a search engine. Write {n} different rephrasings of the question below, using other
+words and likely synonyms, so that relevant documents can be found. Output one rephrasing per line,
+without numbering or any other text.
+
+Question: {question}
+"""
+
+HYDE_TEMPLATE = """
+Write a short passage (3 to 5 sentences) that could appear in a document answering the question below.
+Output only the passage.
+
+Question: {question}
+"""
+
+THINK_PATTERN = re.compile(r"<think>.*?</think>", re.DOTALL)
+LIST_PREFIX_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+class QueryExpander:
+    """Generate extra search queries with the LLM: rephrasings (multi-query) or a hypothetical answer (HyDE).
+
+    Expansion adds an LLM call before retrieval, so it is bounded by a latency budget: the call is
+    abandoned when it exceeds the budget (time queued for a worker included), and while the moving
+    average of recent calls is over budget, expansion is skipped (with an occasional probe) and the
+    original query is used alone.
+    """
+
+    def __init__(
+        self,
+        mode: str = QUERY_EXPANSION,
+        num_queries: int = EXPANSION_QUERIES,
+        budget_ms: float = EXPANSION_BUDGET_MS,
+        model: ChatOllama = None,
+    ):
+        self.mode = mode
+        self.num_queries = num_queries
+        self.budget_ms = budget_ms
+        self._model = model
+        self.ema_ms = None
+        self._skipped = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-expansion")
+
+    @property
+    def model(self) -> ChatOllama:
+        if self._model is None:
+            self._model = ChatOllama(model=EXPANSION_MODEL_NAME, temperature=0.3, base_url=OLLAMA_URL)
+        return self._model
+
+    def expand(self, query: str, mode: str = None) -> list[str]:
+        """Extra queries for `query` (the query itself excluded), [] when disabled or over budget"""
+        mode = mode or self.mode
+        if mode not in EXPANSION_MODES:
+            logging.warning(f"[QueryExpander] Unknown expansion mode {mode!r}, expected one of {EXPANSION_MODES}")
+            mode = "off"
+        if mode == "off":
+            return []
+        with self._lock:
+            if self.ema_ms is not None and self.ema_ms > self.budget_ms and self._skipped < EXPANSION_PROBE_EVERY:
+                self._skipped += 1
+                logging.debug(f"[QueryExpander] Skipped, average {self.ema_ms:.0f} ms over {self.budget_ms:.0f} ms")
+                return []
+            self._skipped = 0
+
+        # The budget and the average count from here, so time queued behind other expansions counts too
+        submitted = time.perf_counter()
+        future = self._executor.submit(self._generate, query, mode, submitted)
+        try:
+            return future.result(timeout=self.budget_ms / 1000)
+        except TimeoutError:
+            if future.cancel():
+                # Never started: record the wait, or a saturated pool would never push the average over budget
+                self._record((time.perf_counter() - submitted) * 1000)
+            # A started call keeps running and still updates the average when it returns
+            logging.info(f"[QueryExpander] {mode} expansion over {self.budget_ms:.0f} ms budget, skipped")
+        except Exception as e:
+            logging.warning(f"[QueryExpander] {mode} expansion failed: {e}")
+        return []
+
+    def _generate(self, query: str, mode: str, submitted: float) -> list[str]:
+        try:
+            if mode == "hyde":
+                text = self._complete(HYDE_TEMPLATE.format(question=query))
+                queries = [text] if text else []
+            else:
+                text = self._complete(MULTI_QUERY_TEMPLATE.format(n=self.num_queries, question=query))
+                queries = self.parse_lines(text, query)[: self.num_queries]
+        finally:
+            elapsed_ms = (time.perf_counter() - submitted) * 1000
+            self._record(elapsed_ms)
+        logging.debug(f"[QueryExpander] {mode} expansion in {elapsed_ms:.0f} ms: {queries}")
+        return queries
+
+    def _record(self, elapsed_ms: float):
+        with self._lock:
+            if self.ema_ms is None:
+                self.ema_ms = elapsed_ms
+            else:
+                self.ema_ms = EXPANSION_EMA_ALPHA * elapsed_ms + (1 - EXPANSION_EMA_ALPHA) * self.ema_ms
+
+    def _complete(self, prompt: str) -> str:
+        return THINK_PATTERN.sub("", self.model.invoke(prompt).content).strip()
+
+    @staticmethod
+    def parse_lines(text: str, query: str) -> list[str]:
+        """One query per line, without list markers, blanks or repeats of the original question"""
+        seen = {query.strip().lower()}
+        queries = []
+        for line in text.splitlines():
+            line = LIST_PREFIX_PATTERN.sub("", line).strip().strip('"')
+            if line and line.lower() not in seen:
+                seen.add(line.lower())
+                queries.append(line)
+        return queries
+
+
+query_expander = QueryExpander()
@@ -0,0 +1,267 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Callable, Optional
+from langchain_ollama import OllamaEmbeddings
+from qdrant_client.models import (
+    VectorParams,
+    Distance,
+    PointStruct,
+    PointIdsList,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+)
+from database.QdrantDB import QdrantDB, PAYLOAD_INDEXES
+
+REINDEX_ON_MISMATCH = os.getenv("REINDEX_ON_MISMATCH", "true").lower() == "true"
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", 64))
+REINDEX_MAX_RATE = float(os.getenv("REINDEX_MAX_RATE", 0))  # Chunks re-embedded per second, 0 = unthrottled
+REINDEX_RECONCILE_ROUNDS = int(os.getenv("REINDEX_RECONCILE_ROUNDS", 5))  # Catch-up passes before pausing writes
+
+VERSION_PATTERN = re.compile(r"^(?P<name>.+)__v(?P<version>\d+)$")
+
+_running: dict[str, "Reindexer"] = {}
+_running_lock = threading.Lock()
+
+
+def versioned_name(collection_name: str, physical_name: str) -> str:
+    """Next physical collection for an alias: test -> test__v2 -> test__v3 ..."""
+    match = VERSION_PATTERN.match(physical_name)
+    version = int(match.group("version")) + 1 if match else 2
+    return f"{collection_name}__v{version}"
+
+
+class Reindexer:
+    """Re-embed a collection with a new embedder into a versioned collection, then cut over with an alias.
+
+    Payloads (content + metadata) are read back from the serving collection and re-embedded in
+    throttled batches, keeping point ids, so keyword indexes stay valid across the cutover. Queries
+    and ingestion keep using the serving collection (and its embedder) meanwhile. Chunks added or
+    deleted during the copy are reconciled in catch-up passes until one finds nothing to do; the last
+    pass and the alias switch run with the collection's writes paused (QdrantDB.write_gate), so no
+    write is lost and none lands with the old embedder after the cutover. Writes of other processes
+    are not paused: run reindex.py while the app is not ingesting into the collection.
+
+    A target collection that already exists and has no alias can only be a build that was interrupted
+    (in-process runs are deduplicated by `reindex_async`); it is dropped when `replace_target` is set,
+    as the automatic reindex does. Otherwise, as for reindex.py without --replace-target, the run fails.
+
+    A collection created before aliases were used has the logical name itself: it is dropped and the
+    alias created right after, so lookups can fail for the time of those two calls.
+    """
+
+    def __init__(
+        self,
+        db: QdrantDB,
+        embedding_function: OllamaEmbeddings = None,
+        vector_size: int = None,
+        batch_size: int = REINDEX_BATCH_SIZE,
+        max_rate: float = REINDEX_MAX_RATE,
+        on_cutover: Callable[[], None] = None,
+        replace_target: bool = False,
+    ):
+        """embedding_function/vector_size default to db.reindex_target (set when a mismatch was detected)"""
+        if embedding_function is None:
+            embedding_function, vector_size = db.reindex_target or (db.embedding_function, db.vector_size)
+        self.db = db
+        self.embedding_function = embedding_function
+        self.vector_size = vector_size
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.on_cutover = on_cutover
+        self.replace_target = replace_target
+        self.progress = {"state": "pending", "copied": 0, "total": 0, "error": None}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def model(self) -> str:
+        return getattr(self.embedding_function, "model", "")
+
+    def start(self) -> "Reindexer":
+        self._thread = threading.Thread(target=self._run_logged, name=f"reindex-{self.db.collection_name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout: float = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run_logged(self):
+        try:
+            self.run()
+        except Exception as e:
+            # Kept in _running so reindex_status reports the error until the next reindex_async
+            self.progress.update(state="failed", error=str(e))
+            logging.error(f"[Reindexer] Reindex of {self.db.collection_name} failed: {e}")
+            return
+        with _running_lock:
+            if _running.get(self.db.collection_name) is self:
+                del _running[self.db.collection_name]
+
+    def run(self) -> str:
+        """Copy, reconcile and cut over. Return the new physical collection name."""
+        client, alias = self.db.client, self.db.collection_name
+        source = self.db.physical_name()
+        target = versioned_name(alias, source)
+        if self.vector_size is None:
+            self.vector_size = len(self.embedding_function.embed_query(".."))
+        self.progress.update(state="copying", total=self.db.get_count())
+        logging.info(f"[Reindexer] Re-embedding {alias} ({source}) into {target} with {self.model}")
+
+        if client.collection_exists(target):
+            if any(a.collection_name == target for a in client.get_aliases().aliases):
+                raise RuntimeError(f"{target} is already served through an alias")
+            if not self.replace_target:
+                raise RuntimeError(
+                    f"{target} already exists: another reindex is building it, or it is left over from an "
+                    f"interrupted run (delete it, or run reindex.py --replace-target)"
+                )
+            logging.warning(f"[Reindexer] Dropping {target} left over from an interrupted reindex")
+            client.delete_collection(target)
+        try:
+            client.create_collection(target, vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE))
+        except Exception as e:
+            # Lost a race with a concurrent reindex creating the same target
+            raise RuntimeError(f"Could not create {target}: {e}") from e
+        try:
+            for field, schema in PAYLOAD_INDEXES.items():
+                client.create_payload_index(target, field_name=field, field_schema=schema)
+
+            copied = self._copy(source, target, skip=set())
+
+            # Chunks ingested or deleted through the alias while copying
+            self.progress["state"] = "reconciling"
+            for _ in range(REINDEX_RECONCILE_ROUNDS):
+                if not self._reconcile(source, target, copied):
+                    break
+            with self.db.write_gate.paused():
+                self._reconcile(source, target, copied)
+                self.progress["state"] = "cutover"
+                self._cutover(alias, source, target)
+        except Exception:
+            # Don't leave a half-built target that would block the next reindex
+            if self.db.physical_name() != target:
+                client.delete_collection(target)
+            raise
+        self.progress["state"] = "done"
+        logging.info(f"[Reindexer] {alias} now points to {target} ({self.model}, {self.vector_size})")
+        if self.on_cutover:
+            self.on_cutover()
+        return target
+
+    def _reconcile(self, source: str, target: str, copied: set) -> int:
+        """Copy points added to source and delete points removed from it since `copied`. Return the changes."""
+        live = set(self._scroll_ids(source))
+        added = live - copied
+        self._copy(source, target, skip=copied, only=added)
+        removed = copied - live
+        if removed:
+            self.db.client.delete(target, points_selector=PointIdsList(points=[self._point_id(i) for i in removed]))
+            copied -= removed
+        if added or removed:
+            logging.info(f"[Reindexer] Reconciled {target}: {len(added)} added, {len(removed)} removed")
+        return len(added) + len(removed)
+
+    def _copy(self, source: str, target: str, skip: set, only: set = None) -> set:
+        """Re-embed points of source into target (all of them, or the `only` ids). Return the copied ids."""
+        for points in self._batches(source, only):
+            points = [point for point in points if str(point.id) not in skip]
+            if not points:
+                continue
+            started = time.perf_counter()
+            vectors = self.embedding_function.embed_documents([point.payload.get("content", "") for point in points])
+            self.db.client.upsert(
+                collection_name=target,
+                points=[
+                    PointStruct(id=point.id, vector=vector, payload={**point.payload, "embed_model": self.model})
+                    for point, vector in zip(points, vectors)
+                ],
+            )
+            skip.update(str(point.id) for point in points)
+            self.progress["copied"] = len(skip)
+            logging.info(f"[Reindexer] {source} -> {target}: {len(skip)}/{self.progress['total']}")
+            if self.max_rate > 0:
+                # Leave embedder capacity to live queries and ingestion
+                time.sleep(max(0.0, len(points) / self.max_rate - (time.perf_counter() - started)))
+        return skip
+
+    def _batches(self, collection_name: str, only: set = None):
+        """Point batches (with payload) of the whole collection, or of the given ids only"""
+        client = self.db.client
+        if only is not None:
+            ids = [self._point_id(point_id) for point_id in only]
+            for start in range(0, len(ids), self.batch_size):
+                yield client.retrieve(collection_name=collection_name, ids=ids[start : start + self.batch_size])
+            return
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name, limit=self.batch_size, offset=offset, with_vectors=False
+            )
+            yield points
+            if offset is None:
+                break
+
+    @staticmethod
+    def _point_id(point_id: str) -> int | str:
+        """Ids are tracked as strings; integer point ids must be sent back as integers"""
+        return int(point_id) if point_id.isdigit() else point_id
+
+    def _scroll_ids(self, collection_name: str):
+        offset = None
+        while True:
+            points, offset = self.db.client.scroll(
+                collection_name=collection_name, limit=1024, offset=offset, with_payload=False, with_vectors=False
+            )
+            yield from (str(point.id) for point in points)
+            if offset is None:
+                break
+
+    def _cutover(self, alias: str, source: str, target: str):
+        client = self.db.client
+        if source == alias:
+            # Legacy collection: its name must be freed before an alias can take it
+            client.delete_collection(source)
+            client.update_collection_aliases(
+                change_aliases_operations=[
+                    CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=alias))
+                ]
+            )
+        else:
+            # Both operations are applied atomically by Qdrant
+            client.update_collection_aliases(
+                change_aliases_operations=[
+                    DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)),
+                    CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=alias)),
+                ]
+            )
+        # Queries and ingestion switch to the new embedder together with the alias
+        self.db.embedding_function, self.db.vector_size = self.embedding_function, self.vector_size
+        self.db.reindex_target = None
+        if source != alias:
+            client.delete_collection(source)
+
+
+def reindex_async(db: QdrantDB, on_cutover: Callable[[], None] = None, **kwargs) -> Reindexer:
+    """Start a background reindex of the collection unless one is already running. Return it.
+
+    A target left by an interrupted run is rebuilt (replace_target defaults to True here).
+    """
+    kwargs.setdefault("replace_target", True)
+    with _running_lock:
+        reindexer = _running.get(db.collection_name)
+        if reindexer and reindexer.progress["state"] != "failed":
+            return reindexer
+        reindexer = _running[db.collection_name] = Reindexer(db, on_cutover=on_cutover, **kwargs)
+    return reindexer.start()
+
+
+def reindex_status(collection_name: str) -> Optional[dict]:
+    """Progress of a running reindex, or the error of the last failed one; None otherwise"""
+    with _running_lock:
+        reindexer = _running.get(collection_name)
+    return dict(reindexer.progress) if reindexer else None
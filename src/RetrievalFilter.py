@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from qdrant_client.models import Filter, FieldCondition, MatchAny, Range
+
+
+@dataclass(frozen=True)
+class RetrievalFilter:
+    """Per-query restriction of the searched chunks, applied inside Qdrant and inside the keyword index.
+
+    sources: chunk `metadata.source` values (file names)
+    page_from/page_to: inclusive 0-based page range (`metadata.page`)
+    created_from/created_to: inclusive unix timestamps on `metadata.created_ts`
+        (chunks ingested before created_ts existed never match a date filter)
+    """
+
+    sources: Optional[tuple[str, ...]] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    created_from: Optional[int] = None
+    created_to: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return (
+            not self.sources
+            and self.page_from is None
+            and self.page_to is None
+            and self.created_from is None
+            and self.created_to is None
+        )
+
+    def to_qdrant(self) -> Optional[Filter]:
+        """Qdrant payload filter (None when nothing is filtered)"""
+        conditions = []
+        if self.sources:
+            conditions.append(FieldCondition(key="metadata.source", match=MatchAny(any=list(self.sources))))
+        if self.page_from is not None or self.page_to is not None:
+            conditions.append(FieldCondition(key="metadata.page", range=Range(gte=self.page_from, lte=self.page_to)))
+        if self.created_from is not None or self.created_to is not None:
+            conditions.append(
+                FieldCondition(key="metadata.created_ts", range=Range(gte=self.created_from, lte=self.created_to))
+            )
+        return Filter(must=conditions) if conditions else None
+
+    def mask(self, pages: np.ndarray, created_ts: np.ndarray) -> np.ndarray:
+        """Page and date part of to_qdrant(), vectorized over chunk columns (created_ts < 0: missing).
+
+        Sources are matched by the caller, which knows how source names are encoded.
+        """
+        mask = np.ones(len(pages), dtype=bool)
+        if self.page_from is not None:
+            mask &= pages >= self.page_from
+        if self.page_to is not None:
+            mask &= pages <= self.page_to
+        if self.created_from is not None or self.created_to is not None:
+            mask &= created_ts >= 0
+            if self.created_from is not None:
+                mask &= created_ts >= self.created_from
+            if self.created_to is not None:
+                mask &= created_ts <= self.created_to
+        return mask
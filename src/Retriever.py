@@ -1,96 +1,201 @@
 import os
 import logging
-from langchain_ollama import OllamaEmbeddings
-from langchain.retrievers import BM25Retriever, EnsembleRetriever
-from langchain.retrievers import ContextualCompressionRetriever
+from dataclasses import dataclass
+from typing import Optional
 from langchain.retrievers.document_compressors import FlashrankRerank
 from langchain.schema.document import Document
-from langchain_qdrant import QdrantVectorStore
 from database.QdrantDB import QdrantDB
+from IndexHolder import IndexHolder
+from Reindexer import reindex_async, REINDEX_ON_MISMATCH
+from QueryExpander import query_expander
+from KeywordIndex import KeywordIndex
+from RetrievalFilter import RetrievalFilter
+from logger import stage_timer
 
-OLLAMA_EMBED_URL = os.getenv("OLLAMA_EMBED_URL", "http://localhost:11434")
-EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME")
-QDRANT_URL = os.getenv("QDRANT_URL")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME")
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
-CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
 SEMANTIC_WEIGHT = float(os.getenv("SEMANTIC_WEIGHT", 0.6))
 KEYWORD_WEIGHT = float(os.getenv("KEYWORD_WEIGHT", 0.4))
 TOP_K = int(os.getenv("TOP_K", 5))
 SEMANTIC_SCORE = float(os.getenv("SEMANTIC_SCORE", 0.5))
 RERANKER_SCORE = float(os.getenv("RERANKER_SCORE", 0.5))
 TOP_N = int(os.getenv("TOP_N", 5))
+RRF_C = 60  # Same constant as LangChain's EnsembleRetriever
+COMPACTION_RATIO = float(os.getenv("COMPACTION_RATIO", 0.2))  # Tombstoned share that triggers compaction
+
+
+@dataclass(frozen=True)
+class HybridIndex:
+    """In-memory part of the retriever published in each index snapshot"""
+
+    keyword_index: Optional[KeywordIndex]
+
+
+def weighted_rrf(doc_lists: list[list[Document]], weights: list[float], c: int = RRF_C) -> list[Document]:
+    """Weighted reciprocal rank fusion (as EnsembleRetriever), deduplicated by point id"""
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for doc_list, weight in zip(doc_lists, weights):
+        for rank, doc in enumerate(doc_list, start=1):
+            key = doc.metadata.get("id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + weight / (rank + c)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
 
 
 class Retriever:
-    def __init__(self):
-        # Initialize model and embeddings
-        self.embedding_function = OllamaEmbeddings(model=EMBED_MODEL_NAME, base_url=OLLAMA_EMBED_URL)
+    def __init__(self, collection_name: str = COLLECTION_NAME, db: QdrantDB = None):
+        """db: QdrantDB of the collection, pass one built on a shared client/embedder to avoid creating new ones"""
         # Custom class
-        self.db = QdrantDB(collection_name=COLLECTION_NAME)
-        # LangChain Qdrant class
-        self.vector_store = QdrantVectorStore(
-            client=self.db.client,
-            collection_name=COLLECTION_NAME,
-            embedding=self.embedding_function,
-        )
-        
-        self.compression_retriever = None
-        self.create_compression_retriever()
+        self.db = db or QdrantDB(collection_name=collection_name)
+        self.collection_name = self.db.collection_name
+        self._compressor = None
 
-    def create_compression_retriever(self):
-        """Create EnsembleReranker retriever by re-index all documents"""
-        try:
+        # Copy-on-write index: queries read the published snapshot while rebuilds run in the background
+        self.index = IndexHolder(builder=self._build_hybrid_index)
 
-            # Initialize ensemble retriever (semantic + keyword)
-            retriever = self.vector_store.as_retriever(
-                search_type="similarity_score_threshold", search_kwargs={"k": TOP_K, "score_threshold": SEMANTIC_SCORE}
-            )    
+        # Collection embedded with another model: keep serving it while a re-embedded copy is built
+        if self.db.reindex_target and REINDEX_ON_MISMATCH:
+            reindex_async(self.db, on_cutover=self.rebuild_index)
 
-            all_doc_chunks = self.db.get_all_docs()
+    @property
+    def embedding_function(self):
+        """Embeddings of the db (they change when a reindex cuts over)"""
+        return self.db.embedding_function
 
-            if not all_doc_chunks:
-                logging.info(f"Fail to init compression_retriever: No documents in Vector DB, use vector store instead.")
-                print(f"Fail to init compression_retriever: No documents in Vector DB, use vector store instead.")
-                self.compression_retriever = retriever
-                return False
+    @property
+    def is_ready(self) -> bool:
+        return self.index.current() is not None
 
-            bm25_retriever = BM25Retriever.from_documents(all_doc_chunks)
-            bm25_retriever.k = TOP_K
-            logging.info(f"Indexed bm25_retriever for {len(all_doc_chunks)} chunks")
-            print(f"Indexed bm25_retriever for {len(all_doc_chunks)} chunks")
+    @property
+    def compressor(self) -> FlashrankRerank:
+        """Reranker, loaded once and shared by every index snapshot"""
+        if self._compressor is None:
+            self._compressor = FlashrankRerank(top_n=TOP_N)
+            logging.info(f"reranker: {self._compressor}")
+        return self._compressor
 
+    def _build_hybrid_index(self):
+        """Re-index all documents for keyword search, streamed from Qdrant. Return (HybridIndex, doc_count)"""
+        keyword_index = KeywordIndex(self.db.iter_records(), fetch_docs=self.db.retrieve_docs)
 
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever, retriever], weights=[KEYWORD_WEIGHT, SEMANTIC_WEIGHT]
-            )
-            # Initialize reranker
-            compressor = FlashrankRerank(top_n=TOP_N)
-            compression_retriever = ContextualCompressionRetriever(
-                base_compressor=compressor, base_retriever=ensemble_retriever
-            )
-            logging.info(f"retriever: {retriever}")
-            logging.info(f"bm25_retriever: {bm25_retriever}")
-            logging.info(f"ensemble_retriever: {ensemble_retriever}")
-            logging.info(f"reranker: {compressor}")
-            logging.info(f"compression_retriever: {compression_retriever}")
-
-            self.compression_retriever = compression_retriever
-            return True
-
-        except Exception as e:
-            logging.info(f"Failed to create compressor: {e}")
-            print(f"Failed to create compressor: {e}")
-            return False
+        if not len(keyword_index):
+            logging.info(f"No documents in Vector DB, use semantic search only.")
+            return HybridIndex(keyword_index=None), 0
+
+        logging.info(f"Indexed keyword index for {len(keyword_index)} chunks")
+        return HybridIndex(keyword_index=keyword_index), len(keyword_index)
+
+    def create_compression_retriever(self):
+        """Rebuild the index on the calling thread and swap it in. Return true if success."""
+        snapshot = self.index.rebuild()
+        return bool(snapshot and snapshot.doc_count)
 
-    def invoke(self, query) -> list[Document]:
-        """Get top retrieved documents from compressor"""
-        return self.compression_retriever.invoke(query)
+    def rebuild_index(self):
+        """Rebuild the index on the background thread; queries keep using the previous snapshot meanwhile"""
+        return self.index.rebuild_async()
 
-    def invoke_with_score_filter(self, query) -> list[Document]:
+    def remove_source(self, source: str) -> bool:
+        """Delete a source in Qdrant (one filtered delete) and tombstone it in the keyword index, no rebuild"""
+        if not self.db.delete_by_source(source):
+            return False
+
+        def tombstone(index: HybridIndex, doc_count: int):
+            if index.keyword_index is None:
+                return index, doc_count
+            keyword_index = index.keyword_index.without_sources([source])
+            return HybridIndex(keyword_index=keyword_index), len(keyword_index)
+
+        snapshot = self.index.mutate(tombstone)
+        if snapshot and snapshot.index.keyword_index:
+            if snapshot.index.keyword_index.tombstone_ratio > COMPACTION_RATIO:
+                self.index.refresh_async(self._compact)
+        return True
+
+    def clear_index(self):
+        """Empty the keyword index after a collection reset, no rebuild"""
+        self.index.mutate(lambda index, doc_count: (HybridIndex(keyword_index=None), 0))
+
+    @staticmethod
+    def _compact(index: HybridIndex, doc_count: int):
+        """Rebuild the keyword postings from live chunks only (runs on the rebuild thread)"""
+        if index.keyword_index is None:
+            return index, doc_count
+        keyword_index = index.keyword_index.compact()
+        return HybridIndex(keyword_index=keyword_index), len(keyword_index)
+
+    def close(self):
+        """Release the in-memory index (the collection in Qdrant is untouched)"""
+        self.index.close()
+
+    def list_sources(self) -> list[str]:
+        snapshot = self.index.current()
+        if snapshot is None or snapshot.index.keyword_index is None:
+            return []
+        return snapshot.index.keyword_index.list_sources()
+
+    def invoke(
+        self, query, filters: RetrievalFilter = None, top_k: int = None, top_n: int = None, expansion: str = None
+    ) -> list[Document]:
+        """Get top reranked documents of the hybrid (semantic + keyword) search.
+
+        filters: restricts both searches (Qdrant payload filter / pre-filtered keyword postings)
+        top_k: candidates taken from each search (default TOP_K)
+        top_n: documents kept after reranking (default TOP_N)
+        expansion: "off", "multi" or "hyde" (default QUERY_EXPANSION), see QueryExpander
+        """
+        # Read the snapshot once so a concurrent swap can't change the index mid-query
+        snapshot = self.index.current()
+        if snapshot is None:
+            return []
+        top_k = top_k or TOP_K
+        keyword_index = snapshot.index.keyword_index
+        timings = {}
+
+        with stage_timer("expand", timings):
+            queries = [query] + query_expander.expand(query, expansion)
+        with stage_timer("embed", timings):
+            query_vectors = self.db.embed_documents(queries) if len(queries) > 1 else [self.db.embed_text(query)]
+        with stage_timer("semantic_search", timings):
+            semantic_lists = self.db.search_vectors_batch(
+                query_vectors,
+                top_k=top_k,
+                score_threshold=SEMANTIC_SCORE,
+                query_filter=filters.to_qdrant() if filters else None,
+            )
+        with stage_timer("keyword_search", timings):
+            keyword_lists = keyword_index.search_many(queries, top_k, filters) if keyword_index else []
+        doc_lists = keyword_lists + semantic_lists
+        weights = [KEYWORD_WEIGHT] * len(keyword_lists) + [SEMANTIC_WEIGHT] * len(semantic_lists)
+        candidates = weighted_rrf(doc_lists, weights)
+        if not candidates:
+            logging.info("[Retriever] No candidates", extra={"timings_ms": timings})
+            return []
+
+        # A single rerank of the merged candidates, against the original question
+        compressor = self.compressor
+        if top_n and top_n != compressor.top_n:
+            compressor = compressor.model_copy(update={"top_n": top_n})
+        with stage_timer("rerank", timings):
+            docs = list(compressor.compress_documents(candidates, query))
+        logging.info(
+            f"[Retriever] {len(docs)} docs from {len(candidates)} candidates of {len(queries)} queries",
+            extra={"timings_ms": timings, "collection": self.collection_name},
+        )
+        return docs
+
+    def invoke_with_score_filter(
+        self,
+        query,
+        filters: RetrievalFilter = None,
+        top_k: int = None,
+        top_n: int = None,
+        score_threshold: float = None,
+        expansion: str = None,
+    ) -> list[Document]:
         """Get Filtered top retrieved documents from compressor"""
-        docs = self.invoke(query)
-        filter_docs = [doc for doc in docs if float(doc.metadata.get("relevance_score")) > RERANKER_SCORE]
+        threshold = RERANKER_SCORE if score_threshold is None else score_threshold
+        docs = self.invoke(query, filters=filters, top_k=top_k, top_n=top_n, expansion=expansion)
+        filter_docs = [doc for doc in docs if float(doc.metadata.get("relevance_score")) > threshold]
         return filter_docs
 
 
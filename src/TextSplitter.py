@@ -0,0 +1,79 @@
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain.schema.document import Document
+
+SPLIT_WORKERS = int(os.getenv("SPLIT_WORKERS", os.cpu_count() or 1))
+SPLIT_PARALLEL_MIN_DOCS = int(os.getenv("SPLIT_PARALLEL_MIN_DOCS", 32))
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+
+def make_splitter(chunk_size: int, chunk_overlap: int, length_unit: str = "chars") -> RecursiveCharacterTextSplitter:
+    """Build a splitter with the same settings DocumentLoader uses.
+
+    length_unit: "chars" measures chunk_size in characters, "tokens" in tiktoken tokens
+    """
+    kwargs = dict(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        is_separator_regex=True,
+        add_start_index=False,
+        strip_whitespace=True,
+    )
+    if length_unit == "tokens":
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(encoding_name=TOKEN_ENCODING, **kwargs)
+    if length_unit != "chars":
+        raise ValueError(f"Unsupported length_unit: {length_unit}")
+    return RecursiveCharacterTextSplitter(length_function=len, **kwargs)
+
+
+# Splitters of the current worker process, built on first use per settings (closures such as the
+# tiktoken length function can't be pickled, so each process builds its own splitters)
+_worker_splitters: dict[tuple, RecursiveCharacterTextSplitter] = {}
+
+# One pool reused by every call: starting processes costs more than splitting a typical upload
+_pool: ProcessPoolExecutor = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _split_batch(settings: tuple, docs: list[Document]) -> list[Document]:
+    if settings not in _worker_splitters:
+        _worker_splitters[settings] = make_splitter(*settings)
+    return _worker_splitters[settings].split_documents(docs)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+        return _pool
+
+
+def split_documents_parallel(
+    docs: list[Document],
+    chunk_size: int,
+    chunk_overlap: int,
+    length_unit: str = "chars",
+    workers: int = None,
+) -> list[Document]:
+    """Split documents across worker processes. Chunks are returned in document order.
+
+    Below SPLIT_PARALLEL_MIN_DOCS documents the split stays in this process.
+    """
+    workers = workers or SPLIT_WORKERS
+    if workers <= 1 or len(docs) < SPLIT_PARALLEL_MIN_DOCS:
+        return make_splitter(chunk_size, chunk_overlap, length_unit).split_documents(docs)
+
+    # A few batches per worker balances uneven document sizes without paying pickling per document
+    batch_size = max(1, len(docs) // (workers * 4))
+    batches = [docs[i : i + batch_size] for i in range(0, len(docs), batch_size)]
+    settings = (chunk_size, chunk_overlap, length_unit)
+    logging.info(f"Splitting {len(docs)} documents in {len(batches)} batches over {workers} processes")
+    results = _get_pool(workers).map(_split_batch, [settings] * len(batches), batches)
+    return [chunk for chunks in results for chunk in chunks]
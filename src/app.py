@@ -1,9 +1,10 @@
 import streamlit as st
-from logger import setup_logging
 import logging
 from dotenv import load_dotenv
 
 load_dotenv()
+from logger import setup_logging  # after load_dotenv: LOG_* settings are read at import
+
 setup_logging()
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,82 @@
+"""Micro-benchmark: chunks/sec of the default split path versus the fast split mode.
+
+Both paths use the same splitter settings and the same log level, so the difference measured is
+the process-parallel split of the fast mode (the reused worker pool is warmed up first).
+
+Usage (from src/):
+    python benchmarks/bench_splitter.py --docs 2000 --doc-chars 20000 --workers 8
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHUNK_SIZE", "800")
+os.environ.setdefault("CHUNK_OVERLAP", "50")
+
+from langchain.schema.document import Document
+from DocumentLoader import DocumentLoader
+import TextSplitter
+
+WORDS = "retrieval augmented generation vector keyword index chunk overlap rerank query embedding".split()
+
+
+def make_docs(num_docs: int, doc_chars: int, seed: int = 0) -> list[Document]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(num_docs):
+        paragraphs, size = [], 0
+        while size < doc_chars:
+            lines = [" ".join(rng.choices(WORDS, k=rng.randint(5, 30))) for _ in range(rng.randint(1, 6))]
+            paragraph = "\n".join(lines)
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 2
+        docs.append(Document(page_content="\n\n".join(paragraphs), metadata={"source": f"doc_{i}.txt", "page": 0}))
+    return docs
+
+
+def run(docs: list[Document], split_mode: str, **kwargs) -> tuple[float, list[Document]]:
+    loader = DocumentLoader(files=None, split_mode=split_mode, **kwargs)
+    loader.docs = [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in docs]
+    start = time.perf_counter()
+    chunks = loader.get_chunks()
+    return time.perf_counter() - start, chunks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--doc-chars", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--length-unit", default="chars", choices=["chars", "tokens"])
+    args = parser.parse_args()
+
+    log_file = tempfile.NamedTemporaryFile(prefix="bench_splitter_", suffix=".log", delete=False).name
+    logging.basicConfig(
+        filename=log_file, level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+    )
+
+    docs = make_docs(args.docs, args.doc_chars)
+    params = dict(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    print(f"{len(docs)} documents, {sum(len(d.page_content) for d in docs) / 1e6:.1f}M chars, log: {log_file}")
+
+    base_time, base_chunks = run(docs, "default", **params)
+    print(f"default: {len(base_chunks)} chunks in {base_time:.2f}s -> {len(base_chunks) / base_time:,.0f} chunks/s")
+
+    TextSplitter.SPLIT_WORKERS = args.workers
+    # Start the worker processes outside the timed run, as a long-lived app would
+    run(docs[: TextSplitter.SPLIT_PARALLEL_MIN_DOCS], "fast", length_unit=args.length_unit, **params)
+    fast_time, fast_chunks = run(docs, "fast", length_unit=args.length_unit, **params)
+    print(f"fast:    {len(fast_chunks)} chunks in {fast_time:.2f}s -> {len(fast_chunks) / fast_time:,.0f} chunks/s")
+    print(f"speedup: {base_time / fast_time:.2f}x")
+
+    if args.length_unit == "chars":
+        same = [c.page_content for c in base_chunks] == [c.page_content for c in fast_chunks]
+        print(f"identical chunks: {same}")
@@ -0,0 +1,83 @@
+"""Parity check: KeywordIndex rankings against rank_bm25.BM25Okapi, over uuid and integer point ids.
+
+Exits with status 1 when a query's top k scores differ from rank_bm25 (ties may come back in another
+order, so scores are compared rather than ids), or when a point id does not round-trip.
+
+Usage (from src/):
+    python benchmarks/check_keyword_index.py --docs 2000 --queries 200
+"""
+
+import os
+import sys
+import uuid
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rank_bm25 import BM25Okapi
+from langchain.schema.document import Document
+from KeywordIndex import KeywordIndex
+
+WORDS = "retrieval augmented generation vector keyword index chunk overlap rerank query embedding".split()
+WORDS += [f"term{i}" for i in range(200)]
+
+
+def make_corpus(num_docs: int, seed: int = 0) -> list[tuple[int | str, str, dict]]:
+    """Records with a mix of uuid string ids and integer ids (as Qdrant accepts both)"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(num_docs):
+        point_id = str(uuid.UUID(int=rng.getrandbits(128), version=4)) if i % 2 else rng.randrange(2**63)
+        content = " ".join(rng.choices(WORDS, k=rng.randint(5, 80)))
+        records.append((point_id, content, {"source": f"doc_{i % 50}.txt", "page": i % 7}))
+    return records
+
+
+def check(index: KeywordIndex, records: list, queries: list[str], k: int) -> int:
+    """Number of queries whose top k scores differ from rank_bm25 over the same records"""
+    bm25 = BM25Okapi([content.split() for _, content, _ in records])
+    position = {str(point_id): i for i, (point_id, _, _) in enumerate(records)}
+    mismatches = 0
+    for query in queries:
+        scores = bm25.get_scores(query.split())
+        # KeywordIndex only returns chunks containing a query term, which all score above 0
+        expected = [score for score in sorted(scores, reverse=True)[:k] if score > 0]
+        got = [scores[position[doc.metadata["point_id"]]] for doc in index.search(query, k)]
+        if len(got) != len(expected) or any(abs(a - b) > 1e-4 for a, b in zip(got, expected)):
+            mismatches += 1
+            print(f"mismatch for {query!r}: {got[:5]} != {expected[:5]}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    records = make_corpus(args.docs)
+    by_id = {}
+    for point_id, content, metadata in records:
+        # No metadata id, as for points imported from elsewhere: results must be matched by point id
+        by_id[point_id] = Document(page_content=content, metadata={**metadata, "point_id": str(point_id)})
+
+    def fetch_docs(ids: list) -> dict[str, Document]:
+        # A KeyError here means a point id did not come back with its original type and value
+        return {str(point_id): by_id[point_id] for point_id in ids}
+
+    rng = random.Random(1)
+    queries = [" ".join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(args.queries)]
+
+    index = KeywordIndex(records, fetch_docs=fetch_docs)
+    failures = check(index, records, queries, args.k)
+
+    # After a compaction the arrays are rebuilt and must rank like a fresh index over the live chunks
+    removed = {f"doc_{i}.txt" for i in range(0, 50, 5)}
+    compacted = index.without_sources(sorted(removed)).compact()
+    live = [record for record in records if record[2]["source"] not in removed]
+    failures += check(compacted, live, queries, args.k)
+
+    print(f"{len(queries) * 2} queries, {failures} mismatches")
+    sys.exit(1 if failures else 0)
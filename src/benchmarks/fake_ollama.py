@@ -0,0 +1,159 @@
+"""Offline stand-in for the Ollama HTTP API used by AINexus (/api/chat streaming and /api/embed).
+
+Embeddings are deterministic hashed bag-of-words vectors, so texts sharing words are close and
+semantic search still returns sensible neighbours. Chat replies stream NDJSON chunks with a
+configurable time to first token and per-token delay.
+
+Usage (from src/), then point OLLAMA_URL / OLLAMA_EMBED_URL at it:
+    python benchmarks/fake_ollama.py --port 11435 --ttft 0.3 --token-delay 0.02
+"""
+
+import math
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from aiohttp import web
+
+ANSWER_WORDS = "Based on the retrieved context the answer is grounded in the cited sources".split()
+
+
+def embed_text(text: str, dim: int) -> list[float]:
+    vector = [0.0] * dim
+    for token in text.lower().split():
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllama:
+    """aiohttp app serving /api/chat and /api/embed; `start()` runs it on a background thread"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        dim: int = 384,
+        embed_delay: float = 0.005,
+        ttft: float = 0.2,
+        token_delay: float = 0.01,
+        answer_tokens: int = 64,
+    ):
+        self.host = host
+        self.port = port
+        self.dim = dim
+        self.embed_delay = embed_delay
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self._loop: asyncio.AbstractEventLoop = None
+        self._runner: web.AppRunner = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/api/embed", self.handle_embed)
+        app.router.add_post("/api/chat", self.handle_chat)
+        app.router.add_get("/api/tags", self.handle_tags)
+        return app
+
+    async def handle_embed(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body.get("input", "")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        await asyncio.sleep(self.embed_delay * max(1, len(inputs)))
+        return web.json_response(
+            {"model": body.get("model", ""), "embeddings": [embed_text(text, self.dim) for text in inputs]}
+        )
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get("model", "")
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+        start = time.perf_counter()
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        await asyncio.sleep(self.ttft)
+        for i in range(self.answer_tokens):
+            part = {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": ANSWER_WORDS[i % len(ANSWER_WORDS)] + " "},
+                "done": False,
+            }
+            await response.write((json.dumps(part) + "\n").encode("utf-8"))
+            await asyncio.sleep(self.token_delay)
+
+        total_ns = int((time.perf_counter() - start) * 1e9)
+        done = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": total_ns,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": self.answer_tokens,
+            "eval_duration": total_ns,
+        }
+        await response.write((json.dumps(done) + "\n").encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def handle_tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": []})
+
+    def start(self) -> "FakeOllama":
+        threading.Thread(target=self._serve, name="fake-ollama", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        # Resolve the port when an ephemeral one (0) was requested
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embed-delay", type=float, default=0.005, help="Seconds per embedded text")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first chat token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between chat tokens")
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    server = FakeOllama(
+        host=args.host,
+        port=args.port,
+        dim=args.dim,
+        embed_delay=args.embed_delay,
+        ttft=args.ttft,
+        token_delay=args.token_delay,
+        answer_tokens=args.answer_tokens,
+    )
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None)
@@ -0,0 +1,344 @@
+"""Load test: replay a query corpus against the retrieval + generation path with simulated chat users.
+
+Each request does what page/chat.py does for one message: Retriever.invoke_with_score_filter,
+LLM.construct_prompt, then llm.model.stream until the last token. By default everything runs
+offline: a local fake Ollama server (benchmarks/fake_ollama.py) serves chat and embeddings and
+Qdrant runs in memory, seeded with synthetic chunks.
+
+Arrival models:
+    --rate 0     closed loop, --concurrency users send their next query as soon as the previous one ends
+    --rate R     open loop, Poisson arrivals at R queries/s, at most --concurrency in flight
+                 (queue wait is reported separately; it grows when the instance is saturated)
+
+Reported: throughput, latency percentiles (queue wait, retrieval, TTFT, total), error rate and the
+RSS of the process sampled over the run.
+
+Usage (from src/):
+    python benchmarks/load_test.py --concurrency 8 --requests 200
+    python benchmarks/load_test.py --rate 5 --duration 60 --queries queries.txt --json report.json
+    python benchmarks/load_test.py --ollama-url http://localhost:11434 --qdrant-url http://localhost:6333
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_ollama import FakeOllama
+
+WORDS = (
+    "retrieval augmented generation vector keyword index chunk overlap rerank query embedding qdrant "
+    "collection payload filter source page snapshot tenant latency throughput stream token prompt"
+).split()
+
+
+@dataclass
+class RequestResult:
+    scheduled: float
+    queue_wait: float = 0.0
+    retrieval: float = 0.0
+    ttft: float = None
+    total: float = 0.0
+    docs: int = 0
+    error: str = None
+
+
+class PassthroughCompressor:
+    """Keeps the RRF order when FlashRank (or its model download) is unavailable, e.g. fully offline"""
+
+    def __init__(self, top_n: int):
+        self.top_n = top_n
+
+    def compress_documents(self, documents, query):
+        docs = list(documents)[: self.top_n]
+        for doc in docs:
+            doc.metadata["relevance_score"] = 1.0
+        return docs
+
+
+class MemorySampler:
+    """Sample the RSS of this process on a background thread"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.samples: list[tuple[float, int]] = []
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def start(self) -> "MemorySampler":
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _sample(self):
+        self.samples.append((round(time.perf_counter() - self._start, 2), self._process.memory_info().rss))
+
+    def _run(self):
+        while True:
+            self._sample()
+            if self._stop.wait(self.interval):
+                break
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_queries(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(3, 8))) for _ in range(count)]
+
+
+def load_queries(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def seed_collection(db, num_chunks: int, chunk_words: int = 150, batch_size: int = 256, seed: int = 0):
+    from uuid import uuid4
+    from langchain.schema.document import Document
+
+    rng = random.Random(seed)
+    created_ts = int(time.time())
+    for start in range(0, num_chunks, batch_size):
+        chunks = []
+        for i in range(start, min(start + batch_size, num_chunks)):
+            source, page = f"doc_{i // 50}.pdf", (i % 50) // 5
+            chunks.append(
+                Document(
+                    page_content=" ".join(rng.choices(WORDS, k=chunk_words)),
+                    metadata={
+                        "id": str(uuid4()),
+                        "chunk_id": f"{source}:{page}:{i % 5}",
+                        "source": source,
+                        "page": page,
+                        "created_ts": created_ts,
+                    },
+                )
+            )
+        db.add_chunks(chunks)
+
+
+def run_request(
+    retriever, llm, construct_prompt, query: str, result: RequestResult, expansion: str = None
+) -> RequestResult:
+    started = time.perf_counter()
+    result.queue_wait = started - result.scheduled
+    try:
+        docs = retriever.invoke_with_score_filter(query=query, expansion=expansion)
+        result.retrieval = time.perf_counter() - started
+        result.docs = len(docs)
+        prompt = construct_prompt(docs, query)
+        for _ in llm.model.stream(prompt):
+            if result.ttft is None:
+                result.ttft = time.perf_counter() - started
+    except Exception as e:
+        result.error = type(e).__name__
+    result.total = time.perf_counter() - started
+    return result
+
+
+def run_load(
+    retriever, llm, construct_prompt, queries, concurrency, rate, num_requests, duration, expansion=None, seed=0
+):
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + duration if duration else None
+    results: list[RequestResult] = []
+    lock = threading.Lock()
+
+    def more() -> bool:
+        if deadline and time.perf_counter() >= deadline:
+            return False
+        return num_requests is None or len(results) < num_requests
+
+    def submit_one():
+        with lock:
+            if not more():
+                return None
+            result = RequestResult(scheduled=time.perf_counter())
+            results.append(result)
+        return result
+
+    if rate <= 0:
+        # Closed loop: every user waits for its answer before sending the next query
+        def user():
+            while result := submit_one():
+                run_request(retriever, llm, construct_prompt, rng.choice(queries), result, expansion)
+
+        threads = [threading.Thread(target=user, name=f"user-{i}") for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    # Open loop: Poisson arrivals independent of how fast answers come back
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="user") as executor:
+        next_arrival = time.perf_counter()
+        while True:
+            time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            result = submit_one()
+            if result is None:
+                break
+            executor.submit(run_request, retriever, llm, construct_prompt, rng.choice(queries), result, expansion)
+            next_arrival += rng.expovariate(rate)
+    return results
+
+
+def report(results: list[RequestResult], elapsed: float, rss: list[tuple[float, int]]) -> dict:
+    ok = [r for r in results if r.error is None]
+    errors: dict[str, int] = {}
+    for r in results:
+        if r.error:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    def stats(values):
+        return {f"p{q}": round(percentile(values, q) * 1000, 1) for q in (50, 90, 95, 99)} | {
+            "max": round(max(values) * 1000, 1) if values else float("nan")
+        }
+
+    rss_mb = [value / 2**20 for _, value in rss]
+    return {
+        "requests": len(results),
+        "completed": len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "latency_ms": {
+            "queue_wait": stats([r.queue_wait for r in results]),
+            "retrieval": stats([r.retrieval for r in ok]),
+            "ttft": stats([r.ttft for r in ok if r.ttft is not None]),
+            "total": stats([r.total for r in ok]),
+        },
+        "rss_mb": {
+            "start": round(rss_mb[0], 1),
+            "peak": round(max(rss_mb), 1),
+            "end": round(rss_mb[-1], 1),
+            "growth": round(rss_mb[-1] - rss_mb[0], 1),
+        },
+        "rss_samples": [(t, round(value / 2**20, 1)) for t, value in rss],
+    }
+
+
+def print_report(summary: dict):
+    print(
+        f"\n{summary['completed']}/{summary['requests']} requests in {summary['elapsed_s']}s: "
+        f"{summary['throughput_rps']} req/s, error rate {summary['error_rate']:.2%} {summary['errors'] or ''}"
+    )
+    print(f"{'latency (ms)':<14}" + "".join(f"{name:>10}" for name in ("p50", "p90", "p95", "p99", "max")))
+    for stage, values in summary["latency_ms"].items():
+        print(f"{stage:<14}" + "".join(f"{values[name]:>10}" for name in ("p50", "p90", "p95", "p99", "max")))
+    rss = summary["rss_mb"]
+    print(f"RSS (MB): start {rss['start']}, peak {rss['peak']}, end {rss['end']}, growth {rss['growth']:+}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent chat users against retrieval + generation")
+    parser.add_argument("--concurrency", type=int, default=4, help="Simulated users / max in-flight requests")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrival rate in queries/s (0: closed loop)")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument("--queries", default=None, help="Query corpus, one query per line (default: synthetic)")
+    parser.add_argument("--seed-chunks", type=int, default=5000, help="Synthetic chunks to ingest if empty")
+    parser.add_argument("--collection", default="loadtest")
+    parser.add_argument("--qdrant-url", default=":memory:")
+    parser.add_argument("--ollama-url", default=None, help="Use this Ollama server instead of the fake one")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Fake server: seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Fake server: seconds between tokens")
+    parser.add_argument("--answer-tokens", type=int, default=64, help="Fake server: tokens per answer")
+    parser.add_argument("--embed-delay", type=float, default=0.005, help="Fake server: seconds per embedded text")
+    parser.add_argument("--expansion", default=None, choices=["off", "multi", "hyde"], help="Query expansion mode")
+    parser.add_argument("--no-rerank", action="store_true", help="Skip FlashRank (keeps the fused order)")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="RSS sampling period in seconds")
+    parser.add_argument("--json", default=None, help="Also write the report (with RSS samples) to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    fake_ollama = None
+    if args.ollama_url is None:
+        fake_ollama = FakeOllama(
+            ttft=args.ttft,
+            token_delay=args.token_delay,
+            answer_tokens=args.answer_tokens,
+            embed_delay=args.embed_delay,
+        ).start()
+        print(f"Fake Ollama server on {fake_ollama.url}")
+    ollama_url = args.ollama_url or fake_ollama.url
+
+    # Module-level settings and singletons read these at import time
+    os.environ["OLLAMA_URL"] = ollama_url
+    os.environ["OLLAMA_EMBED_URL"] = ollama_url
+    os.environ["QDRANT_URL"] = args.qdrant_url
+    os.environ["COLLECTION_NAME"] = args.collection
+    os.environ.setdefault("MODEL_NAME", "fake-chat")
+    os.environ.setdefault("EMBED_MODEL_NAME", "fake-embed")
+
+    from Retriever import retriever, TOP_N
+    from LLM import LLM, llm
+
+    if retriever.db.get_count() == 0 and args.seed_chunks:
+        start = time.perf_counter()
+        seed_collection(retriever.db, args.seed_chunks)
+        print(f"Seeded {args.seed_chunks} chunks in {time.perf_counter() - start:.1f}s")
+    retriever.create_compression_retriever()
+
+    if args.no_rerank:
+        retriever._compressor = PassthroughCompressor(top_n=TOP_N)
+    else:
+        try:
+            import flashrank  # noqa: F401
+        except ImportError:
+            print("flashrank is not installed, reranking is skipped (--no-rerank)")
+            retriever._compressor = PassthroughCompressor(top_n=TOP_N)
+
+    queries = load_queries(args.queries) if args.queries else synthetic_queries(500)
+    num_requests = None if args.duration else args.requests
+    mode = f"Poisson {args.rate} q/s" if args.rate > 0 else "closed loop"
+    print(f"Replaying {len(queries)} queries, {args.concurrency} users, {mode}")
+
+    sampler = MemorySampler(interval=args.sample_interval).start()
+    start = time.perf_counter()
+    results = run_load(
+        retriever,
+        llm,
+        LLM.construct_prompt,
+        queries,
+        args.concurrency,
+        args.rate,
+        num_requests,
+        args.duration,
+        expansion=args.expansion,
+    )
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    summary = report(results, elapsed, sampler.samples)
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    retriever.close()
+    if fake_ollama:
+        fake_ollama.stop()
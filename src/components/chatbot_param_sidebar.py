@@ -1,16 +1,57 @@
+import time
 import streamlit as st
+from datetime import datetime, time as dt_time
+from RetrievalFilter import RetrievalFilter
+from Retriever import TOP_N, RERANKER_SCORE
+from QueryExpander import QUERY_EXPANSION, EXPANSION_MODES
 
 
 def reset_history():
-    del st.session_state.history
+    st.session_state.messages = []
 
 
-def sidebar_parameters_setting():
+def sidebar_parameters_setting(sources: list[str] = None) -> dict:
+    """Render the RAG parameters, return the keyword arguments for Retriever.invoke_with_score_filter"""
     st.sidebar.write("## Choose the RAG parameters")
     st.sidebar.markdown("### Model")
     st.sidebar.selectbox("Model", ["To be update"], key="model")
     st.sidebar.markdown("### Max number of retrieve documents")
-    st.sidebar.slider("Top_k", 3, 10, key="top_k")
+    st.sidebar.slider("Top_k", 3, 10, value=min(max(TOP_N, 3), 10), key="top_k")
     st.sidebar.markdown("### Retrieve score threshold")
-    st.sidebar.slider("score", 0.5, 1.5, key="score_threshold")
+    st.sidebar.slider("score", 0.0, 1.0, value=RERANKER_SCORE, step=0.05, key="score_threshold")
+    st.sidebar.markdown("### Query expansion")
+    st.sidebar.selectbox(
+        "Expansion",
+        EXPANSION_MODES,
+        index=EXPANSION_MODES.index(QUERY_EXPANSION) if QUERY_EXPANSION in EXPANSION_MODES else 0,
+        format_func={"off": "Off", "multi": "Multi-query (rephrasings)", "hyde": "HyDE (hypothetical answer)"}.get,
+        key="expansion",
+        help="Search with LLM-generated queries too; skipped when the LLM exceeds the latency budget",
+    )
+
+    st.sidebar.markdown("### Filters")
+    selected_sources = st.sidebar.multiselect("Sources", sources or [], key="filter_sources")
+    use_pages = st.sidebar.checkbox("Page range", key="filter_use_pages")
+    page_from, page_to = st.sidebar.slider("Pages", 1, 500, (1, 500), key="filter_pages", disabled=not use_pages)
+    date_range = st.sidebar.date_input("Ingested between", value=(), key="filter_dates")
     st.sidebar.button(":x: Reset Chat History", on_click=reset_history)
+
+    created_from = created_to = None
+    if len(date_range) == 2:
+        created_from = int(time.mktime(datetime.combine(date_range[0], dt_time.min).timetuple()))
+        created_to = int(time.mktime(datetime.combine(date_range[1], dt_time.max).timetuple()))
+
+    filters = RetrievalFilter(
+        sources=tuple(selected_sources) or None,
+        # Pages are shown 1-based, stored 0-based
+        page_from=page_from - 1 if use_pages else None,
+        page_to=page_to - 1 if use_pages else None,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    return {
+        "filters": None if filters.is_empty() else filters,
+        "top_n": st.session_state.top_k,
+        "score_threshold": st.session_state.score_threshold,
+        "expansion": st.session_state.expansion,
+    }
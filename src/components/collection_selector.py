@@ -0,0 +1,26 @@
+import streamlit as st
+from CollectionRegistry import registry
+from Retriever import COLLECTION_NAME
+
+
+def _create_collection():
+    """Runs before the next script run, while the selectbox key can still be written"""
+    registry.get_db(st.session_state.new_collection)
+    st.session_state.collection = st.session_state.new_collection
+
+
+def collection_selector():
+    """Sidebar selector of the tenant collection, return the selected collection name"""
+    if "collection" not in st.session_state:
+        st.session_state.collection = COLLECTION_NAME
+
+    st.sidebar.write("## Knowledge base collection")
+    collections = registry.list_collections()
+    if st.session_state.collection not in collections:
+        collections.append(st.session_state.collection)
+    st.sidebar.selectbox("Collection", collections, key="collection")
+    with st.sidebar.popover("New collection", use_container_width=True):
+        new_collection = st.text_input("Collection name", key="new_collection")
+        st.button("Create", disabled=not new_collection, on_click=_create_collection)
+
+    return st.session_state.collection
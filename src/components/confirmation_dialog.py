@@ -1,15 +1,16 @@
 import streamlit as st
 from time import sleep
-from Retriever import retriever
+from CollectionRegistry import registry
 
 
 @st.dialog("Confirm deletion of document")
-def ConfirmDiaglo(source, placeholder):
+def ConfirmDiaglo(source, placeholder, collection):
     st.info(f"Source: {source}")
     if st.button("Confirm"):
-        ids = retriever.db.get_all_ids(source=source)
-        retriever.db.delete_by_ids(ids=ids)
-        st.success(f"Sucessfully deleted\n\n{ids}")
+        if registry.remove_source(collection, source):
+            st.success(f"Sucessfully deleted\n\n{source}")
+        else:
+            st.error(f"Unable to delete {source}")
         placeholder.empty()
         sleep(1.5)
         st.rerun()
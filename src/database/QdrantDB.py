@@ -1,16 +1,28 @@
 import os
+import json
 import logging
+import threading
+import contextlib
+import httpx
+from typing import Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor
 from qdrant_client import QdrantClient
+from qdrant_client.local.qdrant_local import QdrantLocal
 from qdrant_client.models import (
     VectorParams,
     Distance,
     PointStruct,
     PointIdsList,
+    FilterSelector,
     Filter,
     FieldCondition,
     MatchValue,
     OrderBy,
     Direction,
+    PayloadSchemaType,
+    QueryRequest,
+    DeleteAlias,
+    DeleteAliasOperation,
 )
 from langchain_ollama import OllamaEmbeddings
 from langchain.schema.document import Document
@@ -19,25 +31,133 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME")
 OLLAMA_EMBED_URL = os.getenv("OLLAMA_EMBED_URL", "http://localhost:11434")  # Default to localhost if not set
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "test")  # Default to localhost if not set
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+QDRANT_MAX_CONNECTIONS = int(os.getenv("QDRANT_MAX_CONNECTIONS", 32))
 NOLIMIT = 999999
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", 1024))
+SNAPSHOT_PARALLEL = int(os.getenv("SNAPSHOT_PARALLEL", 4))
+SCROLL_BATCH_SIZE = int(os.getenv("SCROLL_BATCH_SIZE", 1024))
+PAYLOAD_INDEXES = {
+    "metadata.source": PayloadSchemaType.KEYWORD,
+    "metadata.page": PayloadSchemaType.INTEGER,
+    "metadata.created_ts": PayloadSchemaType.INTEGER,
+}
+
+
+def create_client() -> QdrantClient:
+    """Create a Qdrant client with a keep-alive HTTP connection pool (gRPC if QDRANT_PREFER_GRPC=true).
+
+    The client is thread safe and meant to be shared by every QdrantDB instance of the process.
+    QDRANT_URL=":memory:" gives an in-process instance (tests, load testing).
+    """
+    if QDRANT_URL == ":memory:":
+        return QdrantClient(location=":memory:")
+    return QdrantClient(
+        url=QDRANT_URL,
+        prefer_grpc=QDRANT_PREFER_GRPC,
+        grpc_port=QDRANT_GRPC_PORT,
+        # Without explicit limits the REST client may disable keep-alive and reconnect per request
+        limits=httpx.Limits(max_connections=QDRANT_MAX_CONNECTIONS, max_keepalive_connections=QDRANT_MAX_CONNECTIONS),
+    )
+
+
+def create_embedding_function(model: str = None) -> OllamaEmbeddings:
+    return OllamaEmbeddings(
+        model=model or EMBED_MODEL_NAME,
+        base_url=OLLAMA_EMBED_URL,  # Use custom Ollama server URL
+    )
+
+
+class WriteGate:
+    """Writes of a collection run concurrently; `paused()` blocks new ones and waits for those in flight.
+
+    Reentrant per thread, so a write made inside another one (add_chunks -> upsert_chunks) never waits.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = 0
+        self._paused = False
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def writing(self):
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._paused)
+                self._active += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._cond:
+                    self._active -= 1
+                    self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def paused(self):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._paused)
+            self._paused = True
+            self._cond.wait_for(lambda: self._active == 0)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._paused = False
+                self._cond.notify_all()
+
+
+# One gate per collection name, shared by every QdrantDB of the process writing to it
+_write_gates: dict[str, WriteGate] = {}
+_write_gates_lock = threading.Lock()
+
+
+def write_gate(collection_name: str) -> WriteGate:
+    with _write_gates_lock:
+        return _write_gates.setdefault(collection_name, WriteGate())
 
 
 class QdrantDB:
-    def __init__(self, collection_name="test"):
+    def __init__(
+        self,
+        collection_name="test",
+        client: QdrantClient = None,
+        embedding_function: OllamaEmbeddings = None,
+        vector_size: int = None,
+    ):
+        """client/embedding_function/vector_size can be shared between collections, they are created when not given.
+
+        The embedder is only called to probe vector_size, so tools that never embed (snapshot) pass it.
+        """
         self.collection_name = collection_name
-        self.embedding_function = OllamaEmbeddings(
-            model=EMBED_MODEL_NAME,
-            base_url=OLLAMA_EMBED_URL,  # Use custom Ollama server URL
-        )
-        self.client = QdrantClient(url=QDRANT_URL)
-
-        self.vector_size = len(self.embedding_function.embed_query(".."))
+        # Paused by Reindexer while it cuts over; ingestion embeds and upserts inside `write_gate.writing()`
+        self.write_gate = write_gate(collection_name)
+        self.embedding_function = embedding_function or create_embedding_function()
+        self.client = client or create_client()
+
+        self.vector_size = vector_size or len(self.embedding_function.embed_query(".."))
+        # (embedding_function, vector_size) the collection should be re-embedded with, see init_collection
+        self.reindex_target: Optional[tuple[OllamaEmbeddings, int]] = None
         self.init_collection()
 
         logging.info(f"[QdrantDB] Using embedding function: {self.embedding_function}")
-        logging.info(f"[QdrantDB] Embedding dimension: {len(self.embed_text('hi'))}")
+        logging.info(f"[QdrantDB] Embedding dimension: {self.vector_size}")
         logging.info(f"[QdrantDB] Collection: {collection_name} count: {self.get_count()}")
 
+    @property
+    def is_local(self) -> bool:
+        """True for the in-process Qdrant (QDRANT_URL=":memory:")"""
+        return isinstance(getattr(self.client, "_client", None), QdrantLocal)
+
+    @property
+    def embed_model(self) -> str:
+        return getattr(self.embedding_function, "model", EMBED_MODEL_NAME)
+
     def init_collection(self):
         if not self.client.collection_exists(self.collection_name):
             res = self.client.create_collection(
@@ -46,66 +166,109 @@ class QdrantDB:
             )
             if res:
                 logging.info(f"[QdrantDB] Collection {self.collection_name} created.")
+        else:
+            self.check_embedding()
+        self.init_payload_indexes()
+
+    def stored_embedding(self) -> tuple[int, Optional[str]]:
+        """(vector size, embedding model) of the existing collection; the model is None for legacy points"""
+        size = self.client.get_collection(self.collection_name).config.params.vectors.size
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name, limit=1, with_payload=["embed_model"], with_vectors=False
+        )
+        model = points[0].payload.get("embed_model") if points else None
+        return size, model
+
+    def check_embedding(self):
+        """Detect a collection embedded with another model or dimension than the configured embedder.
+
+        The configured embedder becomes `reindex_target` and queries keep being served with the
+        collection's own model until Reindexer switches the collection over. When the stored model
+        is unknown (points written before it was recorded), only a dimension change can be detected.
+        """
+        size, model = self.stored_embedding()
+        if size == self.vector_size and (model is None or model == self.embed_model):
+            return
+        logging.warning(
+            f"[QdrantDB] {self.collection_name} holds {model or 'unknown model'} vectors ({size}), "
+            f"configured {self.embed_model} ({self.vector_size}): reindex required"
+        )
+        self.reindex_target = (self.embedding_function, self.vector_size)
+        if model:
+            self.embedding_function = create_embedding_function(model)
+        self.vector_size = size
+
+    def physical_name(self) -> str:
+        """Name of the collection behind `collection_name`, which is an alias once reindexed"""
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.collection_name:
+                return alias.collection_name
+        return self.collection_name
+
+    def init_payload_indexes(self):
+        """Index the payload fields used by retrieval filters so filtered searches don't scan every point"""
+        try:
+            existing = self.client.get_collection(self.collection_name).payload_schema
+            for field, schema in PAYLOAD_INDEXES.items():
+                if field not in existing:
+                    self.client.create_payload_index(self.collection_name, field_name=field, field_schema=schema)
+                    logging.info(f"[QdrantDB] Created payload index {field} on {self.collection_name}")
+        except Exception as e:
+            logging.warning(f"[QdrantDB] Unable to create payload indexes: {e}")
 
     def reset_collection(self):
         if self.client.collection_exists(self.collection_name):
             try:
-                if res := self.client.delete_collection(self.collection_name):
-                    logging.info(f"[QdrantDB] Collection {self.collection_name} deleted.")
+                physical_name = self.physical_name()
+                if physical_name != self.collection_name:
+                    self.client.update_collection_aliases(
+                        change_aliases_operations=[
+                            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.collection_name))
+                        ]
+                    )
+                if res := self.client.delete_collection(physical_name):
+                    logging.info(f"[QdrantDB] Collection {physical_name} deleted.")
             except Exception as e:
                 logging.info(f"[QdrantDB] No existing collection to delete: {e}")
 
+        # An empty collection needs no reindex, recreate it with the configured embedder
+        if self.reindex_target:
+            self.embedding_function, self.vector_size = self.reindex_target
+            self.reindex_target = None
+
         self.client.create_collection(
             collection_name=self.collection_name,
             vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE),
         )
+        self.init_payload_indexes()
 
     def add_chunks(self, chunks: list[Document]) -> bool:
         """Add chunks to the Qdrant collection.
         Return true if success.
         """
         try:
-            logging.info(f"[QdrantDB] Adding new documents: {len(chunks)}...")
-            print(f"[QdrantDB] Adding new documents: {len(chunks)}...")
-
-            embeddings = self.embed_documents([chunk.page_content for chunk in chunks])
-            # print(len(chunks))
-            # print(len(embeddings))
-            # print(len(embeddings[0]))
-
-            points = [
-                PointStruct(
-                    id=chunk.metadata["id"],
-                    vector=embedding,
-                    payload={"content": chunk.page_content, "metadata": chunk.metadata},
-                )
-                for embedding, chunk in zip(embeddings, chunks)
-            ]
-
-            # points = []
-            # for chunk in chunks:
-            #     pointId = chunk.metadata["id"]
-            #     embedding = self.embed_text(chunk.page_content)
-            #     point = PointStruct(
-            #         id = pointId,
-            #         vector= embedding,
-            #         payload= {
-            #             "content": chunk.page_content,
-            #             "metadata": chunk.metadata
-            #         }
-            #     )
-            #     points.append(point)
-
-            self.client.upsert(collection_name=self.collection_name, points=points)
-
-            print(f"[QdrantDB] Total count after adding: {self.get_count()}.")
-            logging.info(f"[QdrantDB] Total count after adding: {self.get_count()}.")
+            with self.write_gate.writing():
+                embeddings = self.embed_documents([chunk.page_content for chunk in chunks])
+                self.upsert_chunks(chunks, embeddings)
+            logging.info(f"[QdrantDB] Added {len(chunks)} documents to {self.collection_name}")
             return True
         except Exception as e:
-            print(f"[QdrantDB] Error adding documents: {e}")
             logging.error(f"[QdrantDB] Error adding documents: {e}")
             return False
 
+    def upsert_chunks(self, chunks: list[Document], embeddings: list[list[float]]):
+        """Upsert already embedded chunks. Point ids come from chunk.metadata["id"], so re-sending a batch is idempotent."""
+        points = [
+            PointStruct(
+                id=chunk.metadata["id"],
+                vector=embedding,
+                payload={"content": chunk.page_content, "metadata": chunk.metadata, "embed_model": self.embed_model},
+            )
+            for embedding, chunk in zip(embeddings, chunks)
+        ]
+        with self.write_gate.writing():
+            self.client.upsert(collection_name=self.collection_name, points=points)
+
     def embed_text(self, text: str) -> list:
         """Embed text using the embedding function."""
         return self.embedding_function.embed_query(text)
@@ -160,6 +323,32 @@ class QdrantDB:
             for point in points
         ]
 
+    def iter_records(self, batch_size: int = SCROLL_BATCH_SIZE) -> Iterator[tuple[str, str, dict]]:
+        """Stream (point id, content, metadata) of every point, one scroll page in memory at a time"""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            for point in points:
+                yield str(point.id), point.payload.get("content", ""), point.payload.get("metadata", {})
+            if offset is None:
+                break
+
+    def retrieve_docs(self, ids: list[int | str]) -> dict[str, Document]:
+        """Documents of the given point ids keyed by str(point id) (ids no longer in the collection are missing)"""
+        points = self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=True)
+        return {
+            str(point.id): Document(
+                page_content=point.payload.get("content", ""), metadata=point.payload.get("metadata", {})
+            )
+            for point in points
+        }
+
     def get_all_data(self, limit=NOLIMIT):
         count = self.get_count()
         if count == int(0):
@@ -192,10 +381,139 @@ class QdrantDB:
     def delete_by_ids(self, ids: list):
         """Delete documents by their IDs."""
         try:
-            self.client.delete(collection_name=self.collection_name, points_selector=PointIdsList(points=ids))
+            with self.write_gate.writing():
+                self.client.delete(collection_name=self.collection_name, points_selector=PointIdsList(points=ids))
         except Exception as e:
             logging.error(f"[QdrantDB] Error deleting documents: {e}")
-            print(f"[QdrantDB] Error deleting documents: {e}")
+
+    def delete_by_source(self, source: str) -> bool:
+        """Delete every point of a source with one server-side filtered delete. Return true if success."""
+        try:
+            with self.write_gate.writing():
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=FilterSelector(
+                        filter=Filter(must=[FieldCondition(key="metadata.source", match=MatchValue(value=source))])
+                    ),
+                )
+            logging.info(f"[QdrantDB] Deleted source {source} from {self.collection_name}")
+            return True
+        except Exception as e:
+            logging.error(f"[QdrantDB] Error deleting source {source}: {e}")
+            return False
+
+    def export_collection(self, path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> int:
+        """Stream all points (id, vector, payload) to a Parquet file in bounded batches. Return the point count.
+
+        Only one batch is held in memory at a time; vectors are stored as fixed size float32 lists so the
+        file can be re-imported without re-embedding.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [
+                ("id", pa.string()),
+                ("vector", pa.list_(pa.float32(), self.vector_size)),
+                ("content", pa.string()),
+                ("metadata", pa.string()),
+            ],
+            metadata={
+                "collection": self.collection_name,
+                "vector_size": str(self.vector_size),
+                "distance": Distance.COSINE.value,
+                "embed_model": self.embed_model,
+            },
+        )
+        total = 0
+        offset = None
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                if points:
+                    batch = pa.record_batch(
+                        [
+                            pa.array([str(point.id) for point in points], pa.string()),
+                            pa.array([point.vector for point in points], schema.field("vector").type),
+                            pa.array([point.payload.get("content", "") for point in points], pa.string()),
+                            pa.array([json.dumps(point.payload.get("metadata", {})) for point in points], pa.string()),
+                        ],
+                        schema=schema,
+                    )
+                    writer.write_batch(batch)
+                    total += len(points)
+                    logging.info(f"[QdrantDB] Exported {total} points from {self.collection_name}")
+                if offset is None:
+                    break
+        logging.info(f"[QdrantDB] Exported {total} points from {self.collection_name} to {path}")
+        return total
+
+    def import_collection(
+        self, path: str, batch_size: int = SNAPSHOT_BATCH_SIZE, parallel: int = SNAPSHOT_PARALLEL
+    ) -> int:
+        """Bulk load a file written by export_collection with parallel upserts. Return the point count.
+
+        Batches are read lazily and at most 2 * parallel batches are in flight, so memory stays bounded.
+        Point ids are preserved, so importing the same file twice does not duplicate points.
+        """
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        file_metadata = parquet_file.schema_arrow.metadata or {}
+        vector_size = int(file_metadata.get(b"vector_size", self.vector_size))
+        if vector_size != self.vector_size:
+            raise ValueError(
+                f"Snapshot vector size {vector_size} does not match collection {self.collection_name} ({self.vector_size})"
+            )
+
+        embed_model = file_metadata.get(b"embed_model", b"").decode() or None
+        if embed_model and embed_model != self.embed_model:
+            logging.warning(f"[QdrantDB] Snapshot was embedded with {embed_model}, collection uses {self.embed_model}")
+
+        if self.is_local:
+            parallel = 1  # the in-process (":memory:") Qdrant does not support concurrent writes
+        in_flight = threading.BoundedSemaphore(max(1, parallel) * 2)
+        total = 0
+
+        def upsert(points: list[PointStruct]):
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=True)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="qdrant-import") as executor:
+            futures = []
+            for batch in parquet_file.iter_batches(batch_size=batch_size):
+                ids = batch.column("id").to_pylist()
+                vectors = batch.column("vector").flatten().to_numpy().reshape(len(ids), vector_size)
+                contents = batch.column("content").to_pylist()
+                metadatas = batch.column("metadata").to_pylist()
+                points = [
+                    PointStruct(
+                        id=int(point_id) if point_id.isdigit() else point_id,
+                        vector=vector.tolist(),
+                        payload={"content": content, "metadata": json.loads(metadata), "embed_model": embed_model},
+                    )
+                    for point_id, vector, content, metadata in zip(ids, vectors, contents, metadatas)
+                ]
+                in_flight.acquire()
+                futures.append(executor.submit(upsert, points))
+                total += len(points)
+                # Surface upsert errors early instead of after reading the whole file
+                for future in [future for future in futures if future.done()]:
+                    future.result()
+                futures = [future for future in futures if not future.done()]
+            for future in futures:
+                future.result()
+
+        logging.info(f"[QdrantDB] Imported {total} points from {path} into {self.collection_name}")
+        return total
 
     def similarity_search_with_score(self, query_text, top_k=3, score_threshold=0.3):
         """Perform similarity search on query text with top_k results and score."""
@@ -221,9 +539,61 @@ class QdrantDB:
             return sorted_results if sorted_results else None
         except Exception as e:
             logging.error(f"[QdrantDB] Error in similarity search: {e}")
-            print(f"[QdrantDB] Error in similarity search: {e}")
             return None
 
+    def search_vectors(
+        self, query_vector: list[float], top_k=3, score_threshold=None, query_filter: Filter = None
+    ) -> list[Document]:
+        """Vector search restricted by a payload filter; the score is returned in metadata["semantic_score"]"""
+        if len(query_vector) != self.vector_size:
+            # Collection embedded with an unknown model of another dimension, waiting for its reindex
+            logging.debug(f"[QdrantDB] Query dimension {len(query_vector)} != {self.vector_size}, skip semantic search")
+            return []
+        results = self.client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            query_filter=query_filter,
+            limit=top_k,
+            score_threshold=score_threshold,
+            with_payload=True,
+        ).points
+        return [
+            Document(
+                page_content=result.payload.get("content", ""),
+                metadata={**result.payload.get("metadata", {}), "semantic_score": result.score},
+            )
+            for result in results
+        ]
+
+    def search_vectors_batch(
+        self, query_vectors: list[list[float]], top_k=3, score_threshold=None, query_filter: Filter = None
+    ) -> list[list[Document]]:
+        """`search_vectors` for several query vectors in one request (Qdrant runs the searches in parallel)"""
+        if len(query_vectors) == 1:
+            return [self.search_vectors(query_vectors[0], top_k, score_threshold, query_filter)]
+        if any(len(vector) != self.vector_size for vector in query_vectors):
+            logging.debug(f"[QdrantDB] Query dimension != {self.vector_size}, skip semantic search")
+            return [[] for _ in query_vectors]
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                QueryRequest(
+                    query=vector, filter=query_filter, limit=top_k, score_threshold=score_threshold, with_payload=True
+                )
+                for vector in query_vectors
+            ],
+        )
+        return [
+            [
+                Document(
+                    page_content=result.payload.get("content", ""),
+                    metadata={**result.payload.get("metadata", {}), "semantic_score": result.score},
+                )
+                for result in response.points
+            ]
+            for response in responses
+        ]
+
     def similarity_search(self, query_text, top_k=3):
         """Perform similarity search on query text with top_k results."""
         try:
@@ -237,7 +607,6 @@ class QdrantDB:
             ]
         except Exception as e:
             logging.error(f"[QdrantDB] Error in similarity search: {e}")
-            print(f"[QdrantDB] Error in similarity search: {e}")
             return []
 
 
@@ -1,10 +1,106 @@
-import logging
-import logging.config
 import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+import contextvars
+from uuid import uuid4
 from datetime import datetime
+from contextlib import contextmanager
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_JSON = os.getenv("LOG_JSON", "true").lower() == "true"
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size")  # "size" or "time" (daily at midnight)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 50 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 7))
+LOG_MAX_MESSAGE = int(os.getenv("LOG_MAX_MESSAGE", 2000))  # Longer messages are truncated
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.1))  # Share of `sampled` payload records kept
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+
+STANDARD_FORMAT = "%(asctime)s [%(levelname)s] %(name)s [%(request_id)s]: %(message)s"
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and goes to the JSON record
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "sampled"}
+
+_listener: logging.handlers.QueueListener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the current request id on the record (runs in the caller thread, before queueing)"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class PayloadFilter(logging.Filter):
+    """Drop most `sampled` records and truncate long messages before they are queued"""
+
+    def __init__(self, max_message: int = LOG_MAX_MESSAGE, sample_rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.max_message = max_message
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        if getattr(record, "sampled", False) and random.random() >= self.sample_rate:
+            return False
+        message = record.getMessage()
+        if len(message) > self.max_message:
+            record.msg = f"{message[: self.max_message]}... [truncated {len(message) - self.max_message} chars]"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message and any `extra=` fields"""
 
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _file_handler(log_file_path: str, rotation: str) -> logging.Handler:
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file_path, when="midnight", backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        log_file_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+def setup_logging(
+    log_dir: str = None,
+    base_file_name: str = "app.log",
+    level: str = LOG_LEVEL,
+    json_format: bool = LOG_JSON,
+    rotation: str = LOG_ROTATION,
+    console: bool = LOG_CONSOLE,
+):
+    """Non-blocking logging: callers only put records on a queue, a QueueListener thread does the I/O.
+
+    Safe to call on every Streamlit rerun, the listener is only started once per process.
+    """
+    global _listener
+    if _listener is not None:
+        return
 
-def setup_logging(log_dir: str = None, base_file_name: str = "app.log", level: str = "INFO"):
     if log_dir is None:
         log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "log")
     os.makedirs(log_dir, exist_ok=True)
@@ -16,35 +112,66 @@ def setup_logging(log_dir: str = None, base_file_name: str = "app.log", level: s
     log_file_name = f"{date_str}_{base_file_name}"
     log_file_path = os.path.join(log_dir, log_file_name)
 
-    LOGGING_CONFIG = {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "standard": {"format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s"},
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": level,
-                "formatter": "standard",
-                "stream": "ext://sys.stdout",
-            },
-            "file": {
-                "class": "logging.FileHandler",  # simple FileHandler, no rotation
-                "level": level,
-                "formatter": "standard",
-                "filename": log_file_path,
-                "encoding": "utf-8",
-                "mode": "a",
-            },
-        },
-        "root": {
-            "handlers": ["console", "file"],
-            "level": level,
-        },
-    }
-
-    logging.config.dictConfig(LOGGING_CONFIG)
+    file_handler = _file_handler(log_file_path, rotation)
+    file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(STANDARD_FORMAT))
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(STANDARD_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(PayloadFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextmanager
+def request_context(request_id: str = None):
+    """Tag every record logged inside the block (same thread/task) with a request id"""
+    token = request_id_var.set(request_id or uuid4().hex[:12])
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+@contextmanager
+def stage_timer(stage: str, timings: dict = None, logger: logging.Logger = None, **fields):
+    """Time a pipeline stage in ms.
+
+    With `timings`, the duration is only stored there (log one record for the whole request);
+    otherwise a structured record (stage, duration_ms) is logged.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        if timings is not None:
+            timings[stage] = duration_ms
+        else:
+            (logger or logging.getLogger("timing")).info(
+                f"{stage} took {duration_ms} ms", extra={"stage": stage, "duration_ms": duration_ms, **fields}
+            )
 
 
 def add_module_file_handler(logger_name: str, log_dir: str = "log", level=logging.INFO):
@@ -58,10 +185,10 @@ def add_module_file_handler(logger_name: str, log_dir: str = "log", level=loggin
 
     # Avoid adding duplicate handlers
     for handler in logger.handlers:
-        if isinstance(handler, logging.FileHandler) and handler.baseFilename == log_file:
+        if isinstance(handler, logging.FileHandler) and handler.baseFilename == os.path.abspath(log_file):
             return logger
 
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler = _file_handler(log_file, LOG_ROTATION)
     formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
     file_handler.setFormatter(formatter)
     file_handler.setLevel(level)
@@ -1,7 +1,11 @@
 import streamlit as st
 from langchain_core.messages import HumanMessage, AIMessage
-from Retriever import retriever
+from components.collection_selector import collection_selector
+from CollectionRegistry import registry
+from components.chatbot_param_sidebar import sidebar_parameters_setting
 from LLM import LLM, llm
+from logger import request_context, stage_timer
+import time
 import logging
 
 
@@ -13,11 +17,14 @@ def handleClearMessages():
         st.error(f"Unable to clear messages.")
 
 
+retriever = registry.get(collection_selector())
+retrieval_params = sidebar_parameters_setting(retriever.list_sources())
+
 lcol, rcol = st.columns([0.8, 0.2], vertical_alignment="center")
 lcol.title("Chat with Documents")
 rcol.button("Clear Messages", on_click=handleClearMessages, use_container_width=True)
 
-if not retriever.compression_retriever:
+if not retriever.is_ready:
     st.error(f"There is no retriever created yet.")
 else:
     if "messages" not in st.session_state:
@@ -32,11 +39,14 @@ else:
         with st.chat_message("user"):
             st.markdown(query_text)
 
-        with st.chat_message("assistant"):
-            retrieved_docs = retriever.invoke_with_score_filter(query=query_text)
+        with request_context(), st.chat_message("assistant"):
+            timings = {}
+            with stage_timer("retrieval", timings):
+                retrieved_docs = retriever.invoke_with_score_filter(query=query_text, **retrieval_params)
             prompt = LLM.construct_prompt(retrieved_docs, query_text)
-            logging.info(f"retrieved_docs: {retrieved_docs}")
-            logging.info(f"prompt: {prompt}")
+            # Full payloads only at DEBUG, sampled and truncated by the logging filters
+            logging.debug("retrieved_docs: %s", retrieved_docs, extra={"sampled": True})
+            logging.debug("prompt: %s", prompt, extra={"sampled": True})
 
             thinking_expander = st.expander("Thinking...", expanded=True)
             thinking_placeholder = thinking_expander.empty()
@@ -46,7 +56,10 @@ else:
             in_thinking = False
             full_response = None
 
+            generation_start = time.perf_counter()
             for chunk in llm.model.stream(prompt):
+                if "ttft" not in timings:
+                    timings["ttft"] = round((time.perf_counter() - generation_start) * 1000, 2)
                 chunk_content = chunk.content
                 if "<think>" in chunk_content:
                     in_thinking = True
@@ -67,6 +80,7 @@ else:
                 message_placeholder.markdown(response_content + "▌")
                 full_response = chunk if full_response is None else full_response + chunk
 
+            timings["generation"] = round((time.perf_counter() - generation_start) * 1000, 2)
             message_placeholder.markdown(response_content)
 
             # Clear the thinking placeholder if no thinking content was added
@@ -86,8 +100,14 @@ else:
                 with st.expander("**Usage Metadata:**"):
                     st.json(full_response.usage_metadata)
 
-            logging.info(f"sources: {formatted_refs}")
-            logging.info(f"Usage_metadata: {full_response.usage_metadata}")
+            logging.info(
+                f"Answered query with {len(retrieved_docs)} docs",
+                extra={
+                    "timings_ms": timings,
+                    "sources": [doc.metadata.get("source") for doc in retrieved_docs],
+                    "usage_metadata": full_response.usage_metadata,
+                },
+            )
 
         st.session_state.messages.append(
             {
@@ -1,14 +1,17 @@
 import streamlit as st
 from components.confirmation_dialog import ConfirmDiaglo
-from Retriever import retriever
+from components.collection_selector import collection_selector
+from CollectionRegistry import registry
+from Reindexer import reindex_status
 
 PREVIEW_NO = 3
+collection = collection_selector()
+db = registry.get_db(collection)
 
 
 def handleResetCollection():
     try:
-        retriever.db.reset_collection()
-        retriever.create_compression_retriever()
+        registry.reset_collection(collection)
         st.sidebar.success(f"Successfully reset database.")
     except Exception as e:
         st.sidebar.error(f"Unable to reset database.")
@@ -22,7 +25,18 @@ lcol.markdown("""
 
 rcol.button(f"Reset Database", on_click=handleResetCollection, use_container_width=True)
 
-sources, documents = retriever.db.get_all_data(limit=PREVIEW_NO)
+if (status := reindex_status(collection)) and status["state"] == "failed":
+    st.error(
+        f"Re-embedding with the new embedding model failed: {status['error']}. "
+        f"Queries keep using the current collection; the reindex is retried when the collection is next opened."
+    )
+elif status:
+    st.info(
+        f"Re-embedding with the new embedding model ({status['state']}): {status['copied']}/{status['total']} chunks. "
+        f"Queries use the current collection until the switch."
+    )
+
+sources, documents = db.get_all_data(limit=PREVIEW_NO)
 if not sources or not documents:
     st.info(f"There is no documents in the database. Please upload some documents.")
 else:
@@ -48,7 +62,7 @@ else:
                     placeholder.markdown(f"### {src}")
                     is_click = placeholder.button(f":x: :red[Delete document]", key=src, use_container_width=True)
                     if is_click:
-                        ConfirmDiaglo(src, placeholder)
+                        ConfirmDiaglo(src, placeholder, collection)
 
                     text = ""
                     for i, chunk in enumerate(chunks):
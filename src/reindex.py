@@ -0,0 +1,36 @@
+"""Re-embed a collection with the configured EMBED_MODEL_NAME and switch its alias to the new collection.
+
+Usage (from src/):
+    python reindex.py --collection test --max-rate 200
+"""
+
+import argparse
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database.QdrantDB import QdrantDB, COLLECTION_NAME
+from Reindexer import Reindexer, REINDEX_BATCH_SIZE, REINDEX_MAX_RATE
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed a Qdrant collection and cut over atomically")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--batch-size", type=int, default=REINDEX_BATCH_SIZE)
+    parser.add_argument("--max-rate", type=float, default=REINDEX_MAX_RATE, help="Chunks per second, 0 = unthrottled")
+    parser.add_argument("--force", action="store_true", help="Reindex even when model and dimension already match")
+    parser.add_argument(
+        "--replace-target", action="store_true", help="Drop an existing target collection left by an interrupted run"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    vector_db = QdrantDB(collection_name=args.collection)
+    if vector_db.reindex_target is None and not args.force:
+        print(f"{args.collection} already uses {vector_db.embed_model}, nothing to do (--force to rebuild anyway)")
+    else:
+        reindexer = Reindexer(
+            vector_db, batch_size=args.batch_size, max_rate=args.max_rate, replace_target=args.replace_target
+        )
+        print(f"{args.collection} now points to {reindexer.run()}")
@@ -0,0 +1,48 @@
+"""Export / import a collection with its embeddings, without re-embedding.
+
+Usage (from src/):
+    python snapshot.py export --collection test --path test.parquet
+    python snapshot.py import --collection test --path test.parquet --parallel 8
+"""
+
+import argparse
+import logging
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+
+load_dotenv()
+
+from database.QdrantDB import QdrantDB, create_client, COLLECTION_NAME, SNAPSHOT_BATCH_SIZE, SNAPSHOT_PARALLEL
+
+
+def snapshot_vector_size(command: str, collection: str, path: str, client: QdrantClient) -> int:
+    """Vector size from the snapshot file (import) or the collection (export), so the embedder is not needed"""
+    if command == "import":
+        import pyarrow.parquet as pq
+
+        metadata = pq.ParquetFile(path).schema_arrow.metadata or {}
+        if b"vector_size" not in metadata:
+            raise SystemExit(f"{path} has no vector_size metadata, not a snapshot file")
+        return int(metadata[b"vector_size"])
+    if not client.collection_exists(collection):
+        raise SystemExit(f"Collection {collection} does not exist")
+    return client.get_collection(collection).config.params.vectors.size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk snapshot export/import of a Qdrant collection")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--path", required=True, help="Parquet snapshot file")
+    parser.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE)
+    parser.add_argument("--parallel", type=int, default=SNAPSHOT_PARALLEL, help="Concurrent upserts (import)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    client = create_client()
+    vector_size = snapshot_vector_size(args.command, args.collection, args.path, client)
+    db = QdrantDB(collection_name=args.collection, client=client, vector_size=vector_size)
+    if args.command == "export":
+        db.export_collection(args.path, batch_size=args.batch_size)
+    else:
+        db.import_collection(args.path, batch_size=args.batch_size, parallel=args.parallel)